@@ -0,0 +1,26 @@
+"""Add conversation history summary
+
+Revision ID: 14d3871ee7af
+Revises: a185c7fe1059
+Create Date: 2026-10-17 13:52:27.511094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '14d3871ee7af'
+down_revision = 'a185c7fe1059'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('history_summary', sa.Text(), nullable=True))
+    op.add_column('conversations', sa.Column('summarized_through_turn', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('conversations', 'summarized_through_turn')
+    op.drop_column('conversations', 'history_summary')
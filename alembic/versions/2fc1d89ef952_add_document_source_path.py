@@ -0,0 +1,28 @@
+"""Add document source_path for streamed uploads
+
+Revision ID: 2fc1d89ef952
+Revises: 7ef81a85bf09
+Create Date: 2026-10-17 16:42:09.583170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2fc1d89ef952'
+down_revision = '7ef81a85bf09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('source_path', sa.String(), nullable=True))
+    op.alter_column('documents', 'content', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    # Large uploads only have their text in their chunks
+    op.execute("UPDATE documents SET content = '' WHERE content IS NULL")
+    op.alter_column('documents', 'content', existing_type=sa.Text(), nullable=False)
+    op.drop_column('documents', 'source_path')
@@ -0,0 +1,42 @@
+"""Add turn embeddings and persona disagreement totals
+
+Revision ID: 36a2f9caa16a
+Revises: 8363eb0c6922
+Create Date: 2026-10-17 10:04:18.662051
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = '36a2f9caa16a'
+down_revision = '8363eb0c6922'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('turns', sa.Column('response_embedding', Vector(1536), nullable=True))
+    op.add_column('turns', sa.Column('disagreement_scores', ARRAY(sa.Float()), nullable=True))
+    op.create_table('persona_disagreements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('model_config_id', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Float(), nullable=False),
+    sa.Column('pair_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ),
+    sa.ForeignKeyConstraint(['model_config_id'], ['model_configs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('conversation_id', 'model_config_id', name='uix_persona_disagreement_conversation_model')
+    )
+    op.create_index(op.f('ix_persona_disagreements_id'), 'persona_disagreements', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_persona_disagreements_id'), table_name='persona_disagreements')
+    op.drop_table('persona_disagreements')
+    op.drop_column('turns', 'disagreement_scores')
+    op.drop_column('turns', 'response_embedding')
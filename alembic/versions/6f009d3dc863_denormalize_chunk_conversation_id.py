@@ -0,0 +1,35 @@
+"""Denormalize conversation_id onto chunks
+
+Revision ID: 6f009d3dc863
+Revises: 9a704753c284
+Create Date: 2026-10-17 12:02:37.418251
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f009d3dc863'
+down_revision = '9a704753c284'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chunks', sa.Column('conversation_id', sa.Integer(), nullable=True))
+    op.execute(
+        'UPDATE chunks SET conversation_id = documents.conversation_id '
+        'FROM documents WHERE chunks.document_id = documents.id'
+    )
+    op.alter_column('chunks', 'conversation_id', nullable=False)
+    op.create_foreign_key(
+        'chunks_conversation_id_fkey', 'chunks', 'conversations', ['conversation_id'], ['id'], ondelete='CASCADE'
+    )
+    op.create_index(op.f('ix_chunks_conversation_id'), 'chunks', ['conversation_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chunks_conversation_id'), table_name='chunks')
+    op.drop_constraint('chunks_conversation_id_fkey', 'chunks', type_='foreignkey')
+    op.drop_column('chunks', 'conversation_id')
@@ -0,0 +1,24 @@
+"""Add conversation corpus version
+
+Revision ID: 7a8914865f35
+Revises: 6f009d3dc863
+Create Date: 2026-10-17 12:41:09.273518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a8914865f35'
+down_revision = '6f009d3dc863'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('corpus_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('conversations', 'corpus_version')
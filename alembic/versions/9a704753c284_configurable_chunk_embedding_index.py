@@ -0,0 +1,30 @@
+"""Configurable chunk embedding index (HNSW or IVFFlat)
+
+Revision ID: 9a704753c284
+Revises: 36a2f9caa16a
+Create Date: 2026-10-17 11:20:53.104417
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9a704753c284'
+down_revision = '36a2f9caa16a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Fixed HNSW build with pgvector's default parameters. Switching to IVFFlat
+    # or other build parameters (VECTOR_INDEX_TYPE, HNSW_M, ...) is done at
+    # runtime by scripts/maintain_vector_index.py, not by this migration.
+    op.execute('DROP INDEX IF EXISTS chunks_embedding_idx')
+    op.execute(
+        'CREATE INDEX chunks_embedding_idx ON chunks '
+        'USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)'
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS chunks_embedding_idx')
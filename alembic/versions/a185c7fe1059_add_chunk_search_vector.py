@@ -0,0 +1,31 @@
+"""Add full-text search vector to chunks
+
+Revision ID: a185c7fe1059
+Revises: 7a8914865f35
+Create Date: 2026-10-17 13:15:42.806133
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+# revision identifiers, used by Alembic.
+revision = 'a185c7fe1059'
+down_revision = '7a8914865f35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Generated column: existing rows are populated by the table rewrite, new
+    # ones on insert
+    op.add_column('chunks', sa.Column(
+        'search_vector', TSVECTOR(), sa.Computed("to_tsvector('english', content)", persisted=True), nullable=True
+    ))
+    op.create_index('ix_chunks_search_vector', 'chunks', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunks_search_vector', table_name='chunks', postgresql_using='gin')
+    op.drop_column('chunks', 'search_vector')
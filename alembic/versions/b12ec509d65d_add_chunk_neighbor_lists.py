@@ -0,0 +1,32 @@
+"""Add precomputed chunk neighbour lists
+
+Revision ID: b12ec509d65d
+Revises: 14d3871ee7af
+Create Date: 2026-10-17 14:31:06.920743
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+# revision identifiers, used by Alembic.
+revision = 'b12ec509d65d'
+down_revision = '14d3871ee7af'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing chunks keep NULL lists and are expanded with the keyed query
+    op.add_column('chunks', sa.Column('semantic_neighbor_ids', ARRAY(sa.Integer()), nullable=True))
+    op.add_column('chunks', sa.Column('paragraph_neighbor_ids', ARRAY(sa.Integer()), nullable=True))
+    op.add_column('chunks', sa.Column('adjacent_neighbor_ids', ARRAY(sa.Integer()), nullable=True))
+    op.add_column('chunks', sa.Column('header_chunk_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('chunks', 'header_chunk_id')
+    op.drop_column('chunks', 'adjacent_neighbor_ids')
+    op.drop_column('chunks', 'paragraph_neighbor_ids')
+    op.drop_column('chunks', 'semantic_neighbor_ids')
@@ -0,0 +1,30 @@
+"""Add conversation chunk count
+
+Revision ID: c4e81f2a9d37
+Revises: 2fc1d89ef952
+Create Date: 2026-10-17 18:03:27.418265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e81f2a9d37'
+down_revision = '2fc1d89ef952'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('chunk_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE conversations SET chunk_count = counts.chunk_count "
+        "FROM (SELECT conversation_id, count(*) AS chunk_count FROM chunks "
+        "WHERE embedding IS NOT NULL GROUP BY conversation_id) AS counts "
+        "WHERE conversations.id = counts.conversation_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('conversations', 'chunk_count')
@@ -1,14 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Tuple
+import asyncio
 import os
-import io
-
-from PyPDF2 import PdfReader
+import tempfile
 
 from app.db import get_db
 from app.models import Document, Conversation
-from app.services.document_processor import process_document
+from app.services.document_sources import (
+    UPLOAD_BLOCK_SIZE,
+    UPLOAD_DIR,
+    count_pdf_pages,
+    read_pdf_text,
+    remove_source,
+    validate_text_file,
+)
+from app.services.ingestion_queue import enqueue_document, ingestion_workers
+from app.services.memory_index import invalidate_conversation
+from app.services.retrieval_cache import bump_corpus_version
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -25,17 +34,76 @@ class DocumentResponse(BaseModel):
         orm_mode = True
 
 
-ALLOWED_EXTENSIONS = {".txt", ".md", ".pdf"}
-MAX_FILE_SIZE = 1 * 1024 * 1024  # 1 MB
+class DocumentUploadResponse(DocumentResponse):
+    job_id: int  # Poll GET /api/ingestion-jobs/{job_id} for chunking and embedding progress
+    job_status: str
 
 
-@router.post("/conversations/{conversation_id}/documents", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
+ALLOWED_EXTENSIONS = {".txt", ".md", ".pdf"}
+MAX_FILE_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(200 * 1024 * 1024)))  # 200 MB
+INLINE_CONTENT_MAX_SIZE = 1 * 1024 * 1024  # Smaller uploads are extracted at upload and stored in documents.content
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload turns out to exceed MAX_FILE_SIZE while it is spooled"""
+
+
+async def spool_upload(file: UploadFile, suffix: str) -> Tuple[str, int]:
+    """Copy an upload to a file in ``UPLOAD_DIR`` in fixed-size blocks.
+
+    Only one block is held in memory at a time. Returns ``(path, size)``; the
+    caller owns the file. The partial file is removed if the copy fails.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=UPLOAD_DIR)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = await file.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > MAX_FILE_SIZE:
+                    raise UploadTooLarge()
+                out.write(block)
+    except BaseException:
+        remove_source(path)
+        raise
+    return path, size
+
+
+def read_upload(path: str, is_pdf: bool, inline: bool):
+    """Extract the text of a small upload, or check that a large one can be read later"""
+    if is_pdf:
+        if not inline:
+            count_pdf_pages(path)
+            return None
+        content = read_pdf_text(path)
+        if not content:
+            raise ValueError("PDF contains no extractable text")
+        return content
+    if not inline:
+        validate_text_file(path)
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@router.post("/conversations/{conversation_id}/documents", response_model=DocumentUploadResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     conversation_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
-    """Upload a document to a conversation"""
+    """Upload a document to a conversation.
+
+    The upload is spooled to disk block by block. Small documents are
+    extracted now and stored in ``documents.content``; larger ones keep the
+    spooled file, which ingestion extracts page by page. Either way the
+    document is queued for chunking and embedding, which run in the
+    background; the response carries the ingestion job to poll.
+    """
     # Check if conversation exists
     conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
     if conversation is None:
@@ -53,41 +121,49 @@ async def upload_document(
     if file_size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="File too large")
 
-    # Read file content
-    content = await file.read()
+    # Copy the upload to disk rather than reading it into memory
+    try:
+        path, file_size = await spool_upload(file, ext.lower())
+    except UploadTooLarge:
+        raise HTTPException(status_code=400, detail="File too large")
 
-    if ext.lower() == ".pdf":
-        try:
-            reader = PdfReader(io.BytesIO(content))
-            extracted_text = []
-            for page in reader.pages:
-                page_text = page.extract_text() or ""
-                extracted_text.append(page_text)
-            content_str = "\n".join(extracted_text).strip()
-            if not content_str:
-                raise HTTPException(status_code=400, detail="PDF contains no extractable text")
-        except Exception:
-            raise HTTPException(status_code=400, detail="Unable to process PDF file")
-    else:
+    is_pdf = ext.lower() == ".pdf"
+    inline = file_size <= INLINE_CONTENT_MAX_SIZE
+    try:
         try:
-            content_str = content.decode("utf-8")
+            content_str = await asyncio.to_thread(read_upload, path, is_pdf, inline)
         except UnicodeDecodeError:
             raise HTTPException(status_code=400, detail="Unable to decode file as UTF-8")
-
-    # Create document
-    document = Document(
-        conversation_id=conversation_id,
-        filename=file.filename,
-        content=content_str
+        except Exception:
+            if is_pdf:
+                raise HTTPException(status_code=400, detail="Unable to process PDF file")
+            raise
+
+        # Create document
+        document = Document(
+            conversation_id=conversation_id,
+            filename=file.filename,
+            content=content_str,
+            source_path=None if inline else path
+        )
+        db.add(document)
+        job = enqueue_document(document, db)
+        db.commit()
+    except BaseException:
+        remove_source(path)
+        raise
+    if inline:
+        remove_source(path)
+    ingestion_workers.notify()
+
+    return DocumentUploadResponse(
+        id=document.id,
+        conversation_id=document.conversation_id,
+        filename=document.filename,
+        created_at=document.created_at,
+        job_id=job.id,
+        job_status=job.status
     )
-    db.add(document)
-    db.commit()
-    db.refresh(document)
-
-    # Process document (chunk and embed)
-    await process_document(document.id, db)
-
-    return document
 
 
 @router.get("/conversations/{conversation_id}/documents", response_model=List[DocumentResponse])
@@ -117,6 +193,12 @@ def delete_document(document_id: int, db: Session = Depends(get_db)):
     document = db.query(Document).filter(Document.id == document_id).first()
     if document is None:
         raise HTTPException(status_code=404, detail="Document not found")
+    conversation_id = document.conversation_id
+    source_path = document.source_path
     db.delete(document)
+    bump_corpus_version(conversation_id, db)
     db.commit()
+    invalidate_conversation(conversation_id)
+    if source_path:
+        remove_source(source_path)
     return None
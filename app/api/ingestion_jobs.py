@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db import get_db
+from app.models import IngestionJob
+from pydantic import BaseModel
+from datetime import datetime
+
+router = APIRouter()
+
+
+class IngestionJobResponse(BaseModel):
+    id: int
+    document_id: int
+    status: str
+    attempts: int
+    chunks_embedded: int
+    chunks_total: Optional[int] = None
+    progress: Optional[float] = None  # chunks_embedded / chunks_total, once the total is known
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+@router.get("/ingestion-jobs/{job_id}", response_model=IngestionJobResponse)
+def get_ingestion_job(job_id: int, db: Session = Depends(get_db)):
+    """Get the state and progress of a document ingestion job"""
+    job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+
+    response = IngestionJobResponse.from_orm(job)
+    if job.chunks_total is not None:
+        response.progress = job.chunks_embedded / job.chunks_total if job.chunks_total else 1.0
+    return response
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+
+from app.db import get_db
+from app.models import Conversation
+from app.services.agent_service import MAX_CHUNKS, build_query_variants, multi_query_retrieval
+from app.services.context_builder import DEFAULT_CONTEXT_WINDOW, MAX_CONTEXT_TOKENS, build_context
+from app.services.embedding_service import generate_embeddings
+from app.services.retrieval_trace import RetrievalTrace
+from app.services.vector_search import explain_search
+from pydantic import BaseModel
+
+router = APIRouter()
+
+
+class RetrieveRequest(BaseModel):
+    query: str
+    limit: int = MAX_CHUNKS
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    mode: Optional[str] = None  # vector, hybrid or lexical (defaults to RETRIEVAL_MODE)
+    analyze: bool = False  # Include the EXPLAIN ANALYZE plan of the vector query (explain only)
+
+
+class RetrievedChunk(BaseModel):
+    id: int
+    document_id: int
+    sequence_number: int
+    content: str
+    score: Optional[float] = None
+    source: Optional[str] = None
+    variants: Optional[Dict[str, Any]] = None
+
+
+class RetrieveResponse(BaseModel):
+    chunks: List[RetrievedChunk]
+    explain: Optional[Dict[str, Any]] = None
+
+
+@router.post("/conversations/{conversation_id}/retrieve", response_model=RetrieveResponse)
+async def retrieve(
+    conversation_id: int,
+    request: RetrieveRequest,
+    explain: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Run multi-query retrieval for a query, optionally explaining where time went
+
+    With ``explain=true`` the retrieval cache is bypassed and the response
+    reports each chunk's score and source stage (``variant`` for search hits,
+    or the context expansion that added it), per-stage wall-clock
+    timings and SQL statement counts, including building the prompt context.
+    ``analyze`` adds the ``EXPLAIN ANALYZE`` plan of the vector query.
+    """
+    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    trace = RetrievalTrace(db) if explain else None
+    try:
+        chunks = await multi_query_retrieval(
+            request.query, conversation_id, db, limit=request.limit,
+            ef_search=request.ef_search, probes=request.probes,
+            corpus_version=conversation.corpus_version, mode=request.mode, trace=trace
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if trace is None:
+        return RetrieveResponse(chunks=[
+            RetrievedChunk(id=chunk.id, document_id=chunk.document_id,
+                           sequence_number=chunk.sequence_number, content=chunk.content)
+            for chunk in chunks
+        ])
+
+    with trace.stage("prompt_building"):
+        context = build_context(conversation.name, [], chunks, db, budget=MAX_CONTEXT_TOKENS or DEFAULT_CONTEXT_WINDOW)
+
+    details = trace.summary()
+    details["context_tokens"] = context["tokens"]
+    details["omitted_chunks"] = context["omitted_chunks"]
+
+    if request.analyze:
+        query_embeddings = await generate_embeddings(build_query_variants(request.query) + [request.query])
+        details["vector_query_plan"] = explain_search(
+            query_embeddings, conversation_id, db, limit=request.limit,
+            ef_search=request.ef_search, probes=request.probes
+        )
+
+    return RetrieveResponse(
+        chunks=[
+            RetrievedChunk(id=chunk.id, document_id=chunk.document_id,
+                           sequence_number=chunk.sequence_number, content=chunk.content,
+                           **trace.chunks.get(chunk.id, {}))
+            for chunk in chunks
+        ],
+        explain=details
+    )
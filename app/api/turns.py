@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+import logging
 from typing import List, Optional
 
 from app.db import get_db
 from app.models import Turn, Conversation, ModelConfig
-from app.services.agent_service import generate_turn_response
+from app.services.agent_service import generate_turn_response, update_disagreement_matrix
 from pydantic import BaseModel
 from datetime import datetime
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 
 class TurnCreate(BaseModel):
     query: Optional[str] = None  # Optional query for the first turn
@@ -75,6 +78,16 @@ async def create_turn(
     )
     db.add(turn)
     db.commit()
+    
+    # Store the response embedding and extend the disagreement matrix. The turn
+    # itself is already saved, so a failure here only delays the update until
+    # the next turn picks up the missing embedding.
+    try:
+        await update_disagreement_matrix(conversation_id, db)
+    except Exception as e:  # noqa: BLE001
+        db.rollback()
+        logger.exception("Failed to update disagreement matrix for conversation %s: %s", conversation_id, e)
+    
     db.refresh(turn)
     
     return turn
@@ -1,8 +1,12 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import API routers
-from app.api import conversations, documents, turns, model_configs, persona_orders, persona_votes
+from app.api import conversations, documents, turns, model_configs, persona_orders, persona_votes, retrieval, ingestion_jobs
+from app.services.document_processor import shutdown_process_pool, warm_up_nlp
+from app.services.ingestion_queue import ingestion_workers
 
 # Create FastAPI app
 app = FastAPI(
@@ -27,6 +31,28 @@ app.include_router(turns.router, prefix="/api", tags=["turns"])
 app.include_router(model_configs.router, prefix="/api", tags=["model_configs"])
 app.include_router(persona_orders.router, prefix="/api", tags=["persona_orders"])
 app.include_router(persona_votes.router, prefix="/api", tags=["persona_votes"])
+app.include_router(retrieval.router, prefix="/api", tags=["retrieval"])
+app.include_router(ingestion_jobs.router, prefix="/api", tags=["ingestion_jobs"])
+
+
+@app.on_event("startup")
+async def start_background_warm_up():
+    """Optionally load the spaCy model after startup without delaying readiness"""
+    app.state.nlp_warm_up = asyncio.create_task(warm_up_nlp())
+
+
+@app.on_event("startup")
+async def start_ingestion_workers():
+    """Start draining the document ingestion queue (INGESTION_WORKERS tasks)"""
+    ingestion_workers.start()
+
+
+@app.on_event("shutdown")
+async def stop_ingestion_workers():
+    """Stop the ingestion workers; interrupted jobs are picked up again later"""
+    await ingestion_workers.stop()
+    shutdown_process_pool()
+
 
 # Mount static files for frontend
 # app.mount("/", StaticFiles(directory="frontend/build", html=True), name="frontend")
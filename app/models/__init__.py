@@ -6,5 +6,8 @@ from .turn import Turn
 from .model_config import ModelConfig
 from .persona_order import PersonaOrder
 from .persona_vote import PersonaVote
+from .embedding_cache_entry import EmbeddingCacheEntry
+from .persona_disagreement import PersonaDisagreement
+from .ingestion_job import IngestionJob
 
-__all__ = ["Base", "Conversation", "Document", "Chunk", "Turn", "ModelConfig", "PersonaOrder", "PersonaVote"]
+__all__ = ["Base", "Conversation", "Document", "Chunk", "Turn", "ModelConfig", "PersonaOrder", "PersonaVote", "EmbeddingCacheEntry", "PersonaDisagreement", "IngestionJob"]
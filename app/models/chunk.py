@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, Text, ForeignKey, String, Boolean, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Text, ForeignKey, String, Boolean, Float, Computed, Index
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from pgvector.sqlalchemy import Vector
 
 from .base import Base, TimestampMixin
@@ -8,13 +9,20 @@ from .base import Base, TimestampMixin
 class Chunk(Base, TimestampMixin):
     """Model for document chunks with vector embeddings and semantic structure metadata"""
     __tablename__ = "chunks"
+    __table_args__ = (
+        Index("ix_chunks_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    # Denormalized from the document so vector search can be scoped to one conversation
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
     sequence_number = Column(Integer, nullable=False)
     content = Column(Text, nullable=False)
     # Using pgvector's Vector type for embeddings
     embedding = Column(Vector(1536), nullable=True)
+    # Full-text search vector, generated by Postgres from the content at insert time
+    search_vector = deferred(Column(TSVECTOR, Computed("to_tsvector('english', content)", persisted=True)))
     
     # Document structure metadata
     section_title = Column(String(255), nullable=True)  # Section title if this chunk is or contains a header
@@ -23,6 +31,12 @@ class Chunk(Base, TimestampMixin):
     semantic_group = Column(String(255), nullable=True)  # Topic/entity cluster this chunk belongs to
     importance_score = Column(Float, nullable=True)  # Importance score (0-1) based on content significance
     
+    # Structural neighbours computed at ingest (see chunk_graph.link_chunk_neighbors); NULL for older chunks
+    semantic_neighbor_ids = Column(ARRAY(Integer), nullable=True)  # Same semantic group, by importance
+    paragraph_neighbor_ids = Column(ARRAY(Integer), nullable=True)  # Same paragraph, by importance
+    adjacent_neighbor_ids = Column(ARRAY(Integer), nullable=True)  # Previous and next chunks
+    header_chunk_id = Column(Integer, nullable=True)  # Header chunk of this chunk's section
+    
     # Relationships
     document = relationship("Document", back_populates="chunks")
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Text
 from sqlalchemy.orm import relationship
 
 from .base import Base, TimestampMixin
@@ -11,12 +11,19 @@ class Conversation(Base, TimestampMixin):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     enable_voting = Column(Boolean, nullable=False, default=False)  # Whether personas can vote for next turn
+    corpus_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped whenever documents change
+    chunk_count = Column(Integer, nullable=False, default=0, server_default="0")  # Embedded chunks, refreshed with corpus_version
+    
+    # Rolling summary of the turns folded out of the prompt history
+    history_summary = Column(Text, nullable=True)
+    summarized_through_turn = Column(Integer, nullable=False, default=0, server_default="0")  # Last folded turn
     
     # Relationships
     documents = relationship("Document", back_populates="conversation", cascade="all, delete-orphan")
     turns = relationship("Turn", back_populates="conversation", cascade="all, delete-orphan")
     persona_orders = relationship("PersonaOrder", back_populates="conversation", cascade="all, delete-orphan")
     persona_votes = relationship("PersonaVote", back_populates="conversation", cascade="all, delete-orphan")
+    persona_disagreements = relationship("PersonaDisagreement", back_populates="conversation", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Conversation(id={self.id}, name={self.name})>"
@@ -11,7 +11,8 @@ class Document(Base, TimestampMixin):
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
     filename = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
+    content = Column(Text, nullable=True)  # NULL for large uploads, which are ingested from source_path
+    source_path = Column(String, nullable=True)  # Spooled upload, kept until the document is deleted
     
     # Relationships
     conversation = relationship("Conversation", back_populates="documents")
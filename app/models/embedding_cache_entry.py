@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Index
+from pgvector.sqlalchemy import Vector
+
+from .base import Base, TimestampMixin
+
+
+class EmbeddingCacheEntry(Base, TimestampMixin):
+    """Model for cached embeddings, addressed by embedding model and text hash"""
+    __tablename__ = "embedding_cache"
+
+    model = Column(String(255), primary_key=True)  # Embedding model that produced the vector
+    text_hash = Column(String(64), primary_key=True)  # SHA-256 hex digest of the embedded text
+    embedding = Column(Vector(1536), nullable=False)
+
+    # Age-based eviction scans by creation time
+    __table_args__ = (
+        Index("ix_embedding_cache_created_at", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<EmbeddingCacheEntry(model={self.model}, text_hash={self.text_hash})>"
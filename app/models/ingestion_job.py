@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, text
+from sqlalchemy.orm import relationship
+
+from .base import Base, TimestampMixin
+
+
+class IngestionJob(Base, TimestampMixin):
+    """Model for queued document ingestion (chunking and embedding) jobs"""
+    __tablename__ = "ingestion_jobs"
+    __table_args__ = (
+        # Workers claim the oldest queued job; the partial index keeps that
+        # lookup small however many finished jobs accumulate
+        Index("ix_ingestion_jobs_queued", "id", postgresql_where=text("status = 'queued'")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="queued", server_default="queued")  # queued, running, succeeded or failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    chunks_total = Column(Integer, nullable=True)  # Known once the document has been chunked
+    chunks_embedded = Column(Integer, nullable=False, default=0, server_default="0")
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Last heartbeat or progress report of a running job
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    document = relationship("Document")
+
+    def __repr__(self):
+        return f"<IngestionJob(id={self.id}, document_id={self.document_id}, status={self.status})>"
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+from .base import Base
+
+
+class PersonaDisagreement(Base):
+    """Model for per-conversation disagreement totals of each persona
+
+    Running sums over the conversation's pairwise turn disagreement matrix: for
+    every ordered pair (turn of this persona, any other turn) the disagreement
+    is added to ``score_sum`` and ``pair_count`` is incremented, so the average
+    disagreement is a single-row lookup.
+    """
+    __tablename__ = "persona_disagreements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
+    model_config_id = Column(Integer, ForeignKey("model_configs.id", ondelete="CASCADE"), nullable=False)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    pair_count = Column(Integer, nullable=False, default=0)
+    
+    # Relationships
+    conversation = relationship("Conversation", back_populates="persona_disagreements")
+    
+    __table_args__ = (
+        UniqueConstraint('conversation_id', 'model_config_id',
+                         name='uix_persona_disagreement_conversation_model'),
+    )
+    
+    @property
+    def average(self) -> float:
+        return self.score_sum / self.pair_count if self.pair_count else 0.5
+    
+    def __repr__(self):
+        return f"<PersonaDisagreement(conversation_id={self.conversation_id}, model_config_id={self.model_config_id}, average={self.average:.3f})>"
@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
+from pgvector.sqlalchemy import Vector
 
 from .base import Base, TimestampMixin
 
@@ -16,6 +18,10 @@ class Turn(Base, TimestampMixin):
     next_turn_override_id = Column(Integer, ForeignKey("model_configs.id"), nullable=True)  # Override for next persona
     response = Column(Text, nullable=False)
     private_thoughts = Column(Text, nullable=True)  # For dual-track conversations
+    response_embedding = Column(Vector(1536), nullable=True)  # Embedding of the public response
+    # Row of the conversation's lower-triangular disagreement matrix: disagreement
+    # with each earlier turn, in turn_number order
+    disagreement_scores = Column(ARRAY(Float), nullable=True)
     
     # Relationships
     conversation = relationship("Conversation", back_populates="turns")
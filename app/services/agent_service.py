@@ -1,4 +1,4 @@
-import openai
+import asyncio
 import os
 import random
 import json
@@ -6,8 +6,15 @@ import numpy as np
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.models import Conversation, Document, Chunk, Turn, ModelConfig, PersonaOrder, PersonaVote
-from app.services.embedding_service import generate_embedding
+from app.models import Conversation, Chunk, Turn, ModelConfig, PersonaOrder, PersonaVote, PersonaDisagreement
+from app.services.embedding_service import generate_embeddings
+from app.services.context_builder import build_context, context_budget
+from app.services.context_expansion import expand_chunk_context
+from app.services.history_compaction import HISTORY_COMPACTION_ENABLED, compact_history
+from app.services.vector_search import search_chunks, lexical_search, reciprocal_rank_fusion
+from app.services.mmr import MMR_ENABLED, MMR_OVERSAMPLE, mmr_rerank
+from app.services.retrieval_cache import RetrievalCache, get_corpus_version, retrieval_cache
+from app.services.retrieval_trace import RetrievalTrace, trace_stage
 
 # API keys and configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -25,6 +32,11 @@ EMBEDDING_DIMENSION = 1536  # Dimension of OpenAI's text-embedding-ada-002
 
 # Retrieval configuration
 MAX_CHUNKS = 10  # Maximum number of chunks to retrieve
+RETRIEVAL_MODES = ("vector", "hybrid", "lexical")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()  # Default mode of multi_query_retrieval
+# In hybrid mode, answer from full-text search alone if the query embedding takes
+# longer than this many seconds (0 always waits for the embedding)
+LEXICAL_FALLBACK_TIMEOUT = float(os.getenv("LEXICAL_FALLBACK_TIMEOUT", "0"))
 
 # Multi-query RAG configuration
 QUERY_TYPES = ["claim", "question", "disagreement"]
@@ -34,126 +46,176 @@ MIN_DISAGREEMENT_SCORE = 0.3  # Minimum disagreement score to consider models in
 MAX_AGREEMENT_SCORE = 0.8    # Maximum agreement score to consider models in agreement
 
 
-# This function is imported from embedding_service.py
-# Keeping reference to avoid import errors
+def select_context_chunks(base_chunks: List[Chunk], db: Session, limit: int,
+                          query_embedding: Optional[List[float]] = None, diversify: bool = False,
+                          trace: Optional[RetrievalTrace] = None) -> List[Chunk]:
+    """Expand search hits with surrounding context and pick the final chunks
 
+    Without ``diversify`` the expansion itself is cut off at ``limit``. With it,
+    the expansion is over-sampled ``MMR_OVERSAMPLE`` times and ``limit`` chunks
+    are chosen from it by maximal marginal relevance to ``query_embedding``, so
+    near-duplicate neighbours (same paragraph, semantic group, adjacent chunks)
+    do not crowd out distinct evidence. Chunks come back in document order.
+    """
+    diversify = diversify and query_embedding is not None
+    
+    with trace_stage(trace, "context_expansion"):
+        expanded = expand_chunk_context(base_chunks, db, limit * MMR_OVERSAMPLE if diversify else limit,
+                                        with_embeddings=diversify)
+    if trace is not None:
+        for chunk, source in expanded:
+            trace.note_chunk(chunk.id, source)
+    
+    result_chunks = [chunk for chunk, _ in expanded]
+    if diversify:
+        with trace_stage(trace, "mmr"):
+            result_chunks = mmr_rerank(query_embedding, result_chunks, db, limit)
+    
+    # Sort chunks by sequence number to maintain document flow
+    result_chunks.sort(key=lambda x: (x.document_id, x.sequence_number))
+    return result_chunks
 
-async def multi_query_retrieval(base_query: str, conversation_id: int, db: Session, limit: int = MAX_CHUNKS) -> List[Chunk]:
-    """Generate multiple query variants and retrieve relevant chunks using all of them"""
-    # Generate query variants
-    query_variants = [
+
+def build_query_variants(base_query: str) -> List[str]:
+    """Query variants searched by multi_query_retrieval, in ``QUERY_TYPES`` order"""
+    return [
         f"Key claim: {base_query}",  # Focus on factual claims
         f"Important question: {base_query}",  # Focus on interrogative aspects
         f"Potential disagreement: {base_query}"  # Focus on contentious points
     ]
+
+
+async def multi_query_retrieval(base_query: str, conversation_id: int, db: Session, limit: int = MAX_CHUNKS,
+                                base_embedding: Optional[List[float]] = None, ef_search: Optional[int] = None,
+                                probes: Optional[int] = None, corpus_version: Optional[int] = None,
+                                diversify: bool = MMR_ENABLED, mode: Optional[str] = None,
+                                embedding_timeout: Optional[float] = None,
+                                trace: Optional[RetrievalTrace] = None) -> List[Chunk]:
+    """Generate multiple query variants and retrieve relevant chunks using all of them
+
+    The variants and the base query are embedded in one batch and searched with
+    a single multi-vector statement. Their rankings are combined with reciprocal
+    rank fusion, and the top fused hits are expanded with surrounding context
+    and, with ``diversify``, re-ranked by maximal marginal relevance to the base
+    query (see ``select_context_chunks``).
+
+    ``mode`` (default ``RETRIEVAL_MODE``) selects the rankings that are fused:
+    ``"vector"`` uses the vector searches only, ``"lexical"`` uses full-text
+    search of the base query only and never embeds anything, and ``"hybrid"``
+    runs the full-text search while the queries are being embedded and adds its
+    ranking to the fusion. In hybrid mode, if the embeddings have not arrived
+    within ``embedding_timeout`` seconds (default ``LEXICAL_FALLBACK_TIMEOUT``)
+    the full-text hits are used alone; such degraded results are not cached.
+    Diversifying needs the query embedding, so it does not apply to
+    lexical-only results.
+
+    ``base_embedding`` may be passed when the embedding of ``base_query`` is
+    already known (e.g. a stored turn embedding) to avoid embedding it again.
+    ``ef_search`` / ``probes`` tune the vector index recall for this request.
+
+    Results are cached per conversation corpus version (see ``retrieval_cache``);
+    callers that already loaded the conversation can pass its
+    ``corpus_version`` to save the lookup.
+
+    With a ``trace``, the cache is bypassed and every stage is timed, and each
+    chunk's score and source (the query variants that found it, or the
+    expansion that added it) are recorded on the trace.
+    """
+    mode = (mode or RETRIEVAL_MODE).lower()
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}'. Expected one of: {', '.join(RETRIEVAL_MODES)}")
+    if embedding_timeout is None:
+        embedding_timeout = LEXICAL_FALLBACK_TIMEOUT
+    diversify = diversify and mode != "lexical"
+    
+    cache_key = None
+    if retrieval_cache is not None and trace is None:
+        if corpus_version is None:
+            corpus_version = get_corpus_version(conversation_id, db)
+        cache_key = RetrievalCache.key("multi", conversation_id, corpus_version, base_query, limit,
+                                       ef_search, probes, diversify, mode)
+        cached = retrieval_cache.get(cache_key, db)
+        if cached is not None:
+            return cached
+    
+    # Use half the limit for initial retrieval, over-sampled when diversifying
+    base_limit = limit // 2 * (MMR_OVERSAMPLE if diversify else 1)
     
-    all_chunks = []
-    seen_chunk_ids = set()
-    
-    # Retrieve chunks for each query variant
-    for query in query_variants:
-        chunks = await retrieve_relevant_chunks(query, conversation_id, db, limit=limit//len(query_variants))
-        for chunk in chunks:
-            if chunk.id not in seen_chunk_ids:
-                all_chunks.append(chunk)
-                seen_chunk_ids.add(chunk.id)
-    
-    # If we have fewer chunks than the limit, fill with standard retrieval
-    if len(all_chunks) < limit:
-        standard_chunks = await retrieve_relevant_chunks(base_query, conversation_id, db, limit=limit)
-        for chunk in standard_chunks:
-            if chunk.id not in seen_chunk_ids and len(all_chunks) < limit:
-                all_chunks.append(chunk)
-                seen_chunk_ids.add(chunk.id)
-    
-    return all_chunks
-
-async def retrieve_relevant_chunks(query: str, conversation_id: int, db: Session, limit: int = MAX_CHUNKS):
-    """Retrieve chunks relevant to the query using vector similarity search with context awareness"""
-    # Get document IDs for this conversation
-    document_ids = [doc_id for doc_id, in db.query(Document.id).filter(Document.conversation_id == conversation_id).all()]
-    
-    if not document_ids:
-        return []
-    
-    # Generate embedding for the query
-    query_embedding = await generate_embedding(query)
-    
-    # First, find the most relevant chunks based on vector similarity
-    base_chunks = db.query(Chunk).filter(
-        Chunk.document_id.in_(document_ids),
-        Chunk.embedding.is_not(None)  # Ensure embedding exists
-    ).order_by(
-        Chunk.embedding.cosine_distance(query_embedding)
-    ).limit(limit // 2).all()  # Use half the limit for initial retrieval
-    
-    # Track chunks we've already included
-    included_chunk_ids = {chunk.id for chunk in base_chunks}
-    result_chunks = list(base_chunks)
-    
-    # For each retrieved chunk, add context from surrounding chunks
-    for chunk in base_chunks:
-        # Get document and sequence info
-        doc_id = chunk.document_id
-        seq_num = chunk.sequence_number
-        
-        # Add context from the same semantic group
-        if chunk.semantic_group:
-            semantic_context = db.query(Chunk).filter(
-                Chunk.document_id == doc_id,
-                Chunk.id.notin_(included_chunk_ids),
-                Chunk.semantic_group == chunk.semantic_group
-            ).order_by(
-                Chunk.importance_score.desc()
-            ).limit(2).all()
-            
-            for context_chunk in semantic_context:
-                if context_chunk.id not in included_chunk_ids and len(result_chunks) < limit:
-                    result_chunks.append(context_chunk)
-                    included_chunk_ids.add(context_chunk.id)
+    # Generate query variants
+    query_variants = build_query_variants(base_query)
+    query_embeddings = None
+    lexical_ranking = []
+    
+    if mode == "lexical":
+        with trace_stage(trace, "lexical_search"):
+            lexical_ranking = lexical_search(base_query, conversation_id, db, base_limit)
+    else:
+        started = asyncio.get_running_loop().time()
         
-        # Add context from the same paragraph
-        if chunk.paragraph_id:
-            paragraph_context = db.query(Chunk).filter(
-                Chunk.document_id == doc_id,
-                Chunk.id.notin_(included_chunk_ids),
-                Chunk.paragraph_id == chunk.paragraph_id
-            ).order_by(
-                Chunk.sequence_number
-            ).limit(2).all()
-            
-            for context_chunk in paragraph_context:
-                if context_chunk.id not in included_chunk_ids and len(result_chunks) < limit:
-                    result_chunks.append(context_chunk)
-                    included_chunk_ids.add(context_chunk.id)
+        # Embed all variants and the base query in a single batched call
+        if base_embedding is None:
+            embedding_task = asyncio.ensure_future(generate_embeddings(query_variants + [base_query]))
+        else:
+            embedding_task = asyncio.ensure_future(generate_embeddings(query_variants))
         
-        # Add adjacent chunks (N-1, N+1)
-        adjacent_chunks = db.query(Chunk).filter(
-            Chunk.document_id == doc_id,
-            Chunk.id.notin_(included_chunk_ids),
-            ((Chunk.sequence_number == seq_num - 1) | (Chunk.sequence_number == seq_num + 1))
-        ).all()
+        if mode == "hybrid":
+            # Let the embedding request go out, then run the full-text search
+            # while it is in flight. The search runs on this thread because it
+            # uses the request's session.
+            await asyncio.sleep(0)
+            with trace_stage(trace, "lexical_search"):
+                lexical_ranking = lexical_search(base_query, conversation_id, db, base_limit)
         
-        for adj_chunk in adjacent_chunks:
-            if adj_chunk.id not in included_chunk_ids and len(result_chunks) < limit:
-                result_chunks.append(adj_chunk)
-                included_chunk_ids.add(adj_chunk.id)
+        with trace_stage(trace, "embedding"):
+            if mode == "hybrid" and lexical_ranking and embedding_timeout > 0:
+                remaining = embedding_timeout - (asyncio.get_running_loop().time() - started)
+                try:
+                    # Shielded so late embeddings still complete and land in the embedding cache
+                    embeddings = await asyncio.wait_for(asyncio.shield(embedding_task), timeout=max(remaining, 0))
+                except asyncio.TimeoutError:
+                    embedding_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+                    embeddings = None
+            else:
+                embeddings = await embedding_task
         
-        # Add section header if this chunk is not a header itself
-        if not chunk.is_section_header and chunk.section_title:
-            section_header = db.query(Chunk).filter(
-                Chunk.document_id == doc_id,
-                Chunk.id.notin_(included_chunk_ids),
-                Chunk.is_section_header.is_(True),
-                Chunk.section_title == chunk.section_title
-            ).first()
-            
-            if section_header and section_header.id not in included_chunk_ids and len(result_chunks) < limit:
-                result_chunks.append(section_header)
-                included_chunk_ids.add(section_header.id)
-    
-    # Sort chunks by sequence number to maintain document flow
-    result_chunks.sort(key=lambda x: (x.document_id, x.sequence_number))
+        if embeddings is not None:
+            query_embeddings = embeddings if base_embedding is None else embeddings + [base_embedding]
+    
+    rankings = []
+    if query_embeddings is not None:
+        # Search for all queries at once
+        with trace_stage(trace, "vector_search"):
+            rankings = search_chunks(query_embeddings, conversation_id, db, limit=max(limit, base_limit),
+                                     ef_search=ef_search, probes=probes)
+    elif mode != "lexical":
+        # Lexical fast path: the latency budget ran out before the embeddings
+        base_limit = limit // 2
+        cache_key = None
+    
+    # Fuse the vector rankings and the full-text ranking
+    ranking_names = QUERY_TYPES + ["base"] if rankings else []
+    if lexical_ranking:
+        rankings = rankings + [lexical_ranking]
+        ranking_names = ranking_names + ["lexical"]
+    with trace_stage(trace, "fusion"):
+        fused = reciprocal_rank_fusion([[chunk for chunk, _ in ranking] for ranking in rankings])
+    base_chunks = [chunk for chunk, _ in fused[:base_limit]]
+    
+    if trace is not None:
+        variants = {}
+        for variant, ranking in zip(ranking_names, rankings):
+            score_name = "rank_score" if variant == "lexical" else "distance"
+            for rank, (chunk, score) in enumerate(ranking, start=1):
+                variants.setdefault(chunk.id, {})[variant] = {"rank": rank, score_name: float(score)}
+        for chunk, score in fused[:base_limit]:
+            trace.note_chunk(chunk.id, "variant", score, variants=variants.get(chunk.id))
+    
+    # Add context from surrounding chunks
+    query_embedding = query_embeddings[-1] if query_embeddings is not None else None
+    result_chunks = select_context_chunks(base_chunks, db, limit, query_embedding, diversify, trace)
+    
+    if cache_key is not None:
+        retrieval_cache.put(cache_key, result_chunks)
     
     return result_chunks
 
@@ -166,43 +228,93 @@ def cosine_similarity(vec1, vec2):
     return dot_product / (norm1 * norm2)
 
 
-def calculate_disagreement_score(response1: str, response2: str) -> float:
-    """Calculate a disagreement score between two responses
-    
-    This is a simplified implementation. In a production system, you would use
-    more sophisticated NLP techniques or a model to calculate disagreement.
-    """
-    # For now, we'll use a simple heuristic based on cosine similarity of embeddings
-    # In a real implementation, you would use a more sophisticated approach
-    try:
-        embedding1 = generate_embedding_sync(response1)
-        embedding2 = generate_embedding_sync(response2)
-        similarity = cosine_similarity(embedding1, embedding2)
-        # Convert similarity to a disagreement score (0-1 range)
-        # Higher score means more disagreement
-        return 1.0 - similarity
-    except Exception as e:
-        print(f"Error calculating disagreement score: {e}")
-        return 0.5  # Default to moderate disagreement on error
+def cosine_similarity_matrix(matrix1, matrix2) -> np.ndarray:
+    """Calculate pairwise cosine similarities between the rows of two matrices"""
+    matrix1 = np.asarray(matrix1, dtype=np.float64)
+    matrix2 = np.asarray(matrix2, dtype=np.float64)
+    # Clamped so a zero vector scores 0 against everything instead of NaN
+    norms1 = np.maximum(np.linalg.norm(matrix1, axis=1, keepdims=True), 1e-12)
+    norms2 = np.maximum(np.linalg.norm(matrix2, axis=1, keepdims=True), 1e-12)
+    return (matrix1 / norms1) @ (matrix2 / norms2).T
 
 
-def generate_embedding_sync(text: str) -> List[float]:
-    """Generate embedding synchronously for a text string"""
-    import openai
-    import os
-    
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable not set")
+async def update_disagreement_matrix(conversation_id: int, db: Session) -> int:
+    """Embed new turns and extend the conversation's disagreement matrix
+
+    Every turn without a ``response_embedding`` (normally just the turn that was
+    created) is embedded in one batched call, in turn order. Each one adds a row
+    to the lower-triangular matrix, computed against all earlier turns with a
+    single vectorized cosine similarity, and folds those scores into the
+    per-persona ``PersonaDisagreement`` totals. Returns the number of turns added.
+
+    Updates are serialised per conversation by locking its row for the whole
+    transaction, so concurrent turns cannot score the same pending turn twice.
+    The lock is taken with ``SKIP LOCKED`` (a blocking wait would stall the
+    event loop): if another request holds it, nothing is done here and the
+    turns still pending are picked up by the next update.
+    """
+    locked = db.query(Conversation.id).filter(
+        Conversation.id == conversation_id
+    ).with_for_update(skip_locked=True).first()
+    if locked is None:
+        db.rollback()
+        return 0
+    
+    pending = db.query(Turn).filter(
+        Turn.conversation_id == conversation_id,
+        Turn.response_embedding.is_(None)
+    ).order_by(Turn.turn_number).all()
     
-    openai.api_key = api_key
+    if not pending:
+        db.rollback()
+        return 0
     
-    response = openai.Embedding.create(
-        input=text,
-        model="text-embedding-ada-002"
-    )
+    known = db.query(Turn).filter(
+        Turn.conversation_id == conversation_id,
+        Turn.response_embedding.is_not(None)
+    ).order_by(Turn.turn_number).all()
+    known_embeddings = [np.asarray(turn.response_embedding, dtype=np.float64) for turn in known]
+    
+    embeddings = await generate_embeddings([turn.response for turn in pending])
+    
+    totals = {
+        row.model_config_id: row
+        for row in db.query(PersonaDisagreement).filter(PersonaDisagreement.conversation_id == conversation_id).all()
+    }
+    
+    def add_pairs(model_config_id: Optional[int], score_sum: float, pair_count: int):
+        if not model_config_id or not pair_count:
+            return
+        if model_config_id not in totals:
+            totals[model_config_id] = PersonaDisagreement(
+                conversation_id=conversation_id,
+                model_config_id=model_config_id,
+                score_sum=0.0,
+                pair_count=0
+            )
+            db.add(totals[model_config_id])
+        totals[model_config_id].score_sum += score_sum
+        totals[model_config_id].pair_count += pair_count
+    
+    for turn, embedding in zip(pending, embeddings):
+        earlier = [i for i, other in enumerate(known) if other.turn_number < turn.turn_number]
+        scores = np.zeros(0)
+        if earlier:
+            scores = 1.0 - cosine_similarity_matrix([embedding], [known_embeddings[i] for i in earlier])[0]
+        
+        turn.response_embedding = embedding
+        turn.disagreement_scores = scores.tolist()
+        
+        # The new turn pairs with every earlier turn, and each earlier turn with it
+        add_pairs(turn.model_config_id, float(scores.sum()), len(scores))
+        for i, score in zip(earlier, scores):
+            add_pairs(known[i].model_config_id, float(score), 1)
+        
+        known.append(turn)
+        known_embeddings.append(np.asarray(embedding, dtype=np.float64))
     
-    return response["data"][0]["embedding"]
+    db.commit()
+    return len(pending)
 
 
 def get_next_persona_by_order(conversation_id: int, current_turn_id: int, db: Session) -> Optional[int]:
@@ -324,33 +436,21 @@ async def select_model_for_turn(conversation_id: int, turn_number: int, db: Sess
         ).order_by(Turn.turn_number).all()
         
         if len(last_turns) >= 2:
-            # Calculate disagreement scores for each available model with the previous turn
-            model_scores = []
-            for model in available_models:
-                # We would ideally predict disagreement here, but for now we'll use past performance
-                # if this model was used before in this conversation
-                model_turns = db.query(Turn).filter(
-                    Turn.conversation_id == conversation_id,
-                    Turn.model_config_id == model.id
+            # Score every available model by the average disagreement of its past
+            # turns with all other turns, maintained incrementally as turns are
+            # created (see update_disagreement_matrix)
+            totals = {
+                row.model_config_id: row
+                for row in db.query(PersonaDisagreement).filter(
+                    PersonaDisagreement.conversation_id == conversation_id
                 ).all()
-                
-                if model_turns:
-                    # Calculate average disagreement with other turns
-                    disagreement_scores = []
-                    for mt in model_turns:
-                        for other_turn in db.query(Turn).filter(
-                            Turn.conversation_id == conversation_id,
-                            Turn.id != mt.id,
-                            Turn.turn_number < turn_number
-                        ).all():
-                            score = calculate_disagreement_score(mt.response, other_turn.response)
-                            disagreement_scores.append(score)
-                    
-                    avg_disagreement = sum(disagreement_scores) / len(disagreement_scores) if disagreement_scores else 0.5
-                    model_scores.append((model, avg_disagreement))
-                else:
-                    # No history for this model, assign a neutral score
-                    model_scores.append((model, 0.5))
+            }
+            
+            # No history for a model assigns a neutral score
+            model_scores = [
+                (model, totals[model.id].average if model.id in totals else 0.5)
+                for model in available_models
+            ]
             
             # Sort by disagreement score (descending)
             model_scores.sort(key=lambda x: x[1], reverse=True)
@@ -384,29 +484,20 @@ async def generate_turn_response(conversation_id: int, turn_number: int, query:
             Turn.turn_number < turn_number
         ).order_by(Turn.turn_number).all()
     
-    # Prepare context
-    context = f"Conversation: {conversation_name}\n\n"
-    
-    # Add previous turns to context
-    if previous_turns:
-        context += "Previous turns:\n"
-        for turn in previous_turns:
-            context += f"Turn {turn.turn_number}: {turn.response}\n\n"
-    
     # For the first turn, use the query to retrieve relevant chunks
     # For subsequent turns, use the last turn's response
     search_text = query if turn_number == 1 and query else (previous_turns[-1].response if previous_turns else "")
     
-    # Use multi-query RAG to retrieve relevant chunks
-    relevant_chunks = await multi_query_retrieval(search_text, conversation_id, db)
+    # Reuse the stored embedding of the last turn's response as the base query embedding
+    search_embedding = None
+    if search_text and previous_turns and search_text == previous_turns[-1].response:
+        search_embedding = previous_turns[-1].response_embedding
     
-    # Add relevant chunks to context
-    if relevant_chunks:
-        context += "Relevant document chunks:\n"
-        for chunk in relevant_chunks:
-            document = db.query(Document).filter(Document.id == chunk.document_id).first()
-            filename = document.filename if document else "Unknown"
-            context += f"From {filename}, chunk {chunk.sequence_number}: {chunk.content}\n\n"
+    # Use multi-query RAG to retrieve relevant chunks
+    relevant_chunks = await multi_query_retrieval(
+        search_text, conversation_id, db, base_embedding=search_embedding,
+        corpus_version=conversation.corpus_version if conversation else None
+    )
     
     # Prepare persona-specific prompt based on the selected model
     persona_name = model_config.persona_name
@@ -448,6 +539,21 @@ Provide TWO separate responses:
         
         system_prompt += f"\n\nThis is turn {turn_number}. Respond to the previous messages, focusing on areas where you might have a different perspective or interpretation.{disagreement_points}"
     
+    # Fold turns outside the recent window into the conversation's rolling summary
+    history_summary = None
+    history_turns = previous_turns
+    summarized_through = 0
+    if HISTORY_COMPACTION_ENABLED and conversation:
+        history_summary, history_turns = await compact_history(conversation, previous_turns, model_config)
+        summarized_through = conversation.summarized_through_turn or 0
+    
+    # Fill the model's token budget with previous turns and relevant chunks by priority
+    context = build_context(
+        conversation_name, history_turns, relevant_chunks, db,
+        budget=context_budget(model_config, system_prompt), summary=history_summary,
+        summarized_through=summarized_through
+    )["text"]
+    
     # Generate response using the appropriate API based on the model provider
     provider = model_config.provider.lower()
     model_id = model_config.model_id
@@ -465,6 +571,8 @@ Provide TWO separate responses:
                 return (f"[Placeholder] This is a response from {persona_name} for turn {turn_number}.", 
                         f"[Placeholder] These are private thoughts for turn {turn_number}.")
             
+            import openai  # Deferred to keep app start-up fast
+
             openai.api_key = OPENAI_API_KEY
             response = await openai.ChatCompletion.acreate(
                 model=model_id,
@@ -0,0 +1,242 @@
+import logging
+import math
+import os
+import re
+from typing import Dict, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Index strategy
+VECTOR_INDEX_NAME = "chunks_embedding_idx"
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()  # "hnsw" or "ivfflat"
+INDEX_TYPES = ("hnsw", "ivfflat")
+
+# HNSW build parameters
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+
+# IVFFlat build parameters; lists are derived from the row count unless pinned
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "0"))
+IVFFLAT_RETRAIN_FACTOR = 2.0  # Retrain once the ideal list count drifts this far from the built one
+
+# Conversations with at least this many embedded chunks get their own partial
+# index when they are ingested; smaller ones are always searched exactly, since
+# an ANN scan of the global index followed by the conversation filter can
+# return fewer than the requested number of rows
+CONVERSATION_INDEX_MIN_CHUNKS = int(os.getenv("CONVERSATION_INDEX_MIN_CHUNKS", "10000"))
+CONVERSATION_INDEX_PREFIX = "chunks_embedding_conv_"
+
+# Default per-query recall knobs (unset keeps the server defaults)
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "0")) or None
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "0")) or None
+
+_LISTS_PATTERN = re.compile(r"lists\s*=\s*'?(\d+)'?")
+
+
+def ideal_ivfflat_lists(row_count: int) -> int:
+    """pgvector's recommended list count: rows / 1000 up to 1M rows, sqrt(rows) beyond"""
+    if IVFFLAT_LISTS:
+        return IVFFLAT_LISTS
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def create_index_sql(index_type: str = VECTOR_INDEX_TYPE, row_count: int = 0,
+                     name: str = VECTOR_INDEX_NAME, concurrently: bool = False,
+                     conversation_id: Optional[int] = None) -> str:
+    """DDL for the chunk embedding index using the given strategy
+
+    With ``conversation_id`` the index is partial, covering only that
+    conversation's chunks.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type '{index_type}'. Expected one of: {', '.join(INDEX_TYPES)}")
+
+    if index_type == "hnsw":
+        options = f"m = {int(HNSW_M)}, ef_construction = {int(HNSW_EF_CONSTRUCTION)}"
+    else:
+        options = f"lists = {int(ideal_ivfflat_lists(row_count))}"
+
+    predicate = f" WHERE conversation_id = {int(conversation_id)}" if conversation_id is not None else ""
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}{name} "
+        f"ON chunks USING {index_type} (embedding vector_cosine_ops) WITH ({options}){predicate}"
+    )
+
+
+def describe_index(connection: Connection) -> Optional[Dict]:
+    """Return the type and IVFFlat list count of the current index, if it exists"""
+    definition = connection.execute(
+        sa.text("SELECT indexdef FROM pg_indexes WHERE tablename = 'chunks' AND indexname = :name"),
+        {"name": VECTOR_INDEX_NAME}
+    ).scalar()
+    if definition is None:
+        return None
+
+    index_type = next((t for t in INDEX_TYPES if f"USING {t}" in definition), None)
+    lists_match = _LISTS_PATTERN.search(definition)
+    return {
+        "type": index_type,
+        "lists": int(lists_match.group(1)) if lists_match else None,
+        "definition": definition,
+    }
+
+
+def needs_rebuild(index: Optional[Dict], index_type: str, row_count: int) -> Optional[str]:
+    """Return why the index should be rebuilt, or None if it is fine as is"""
+    if index is None:
+        return "index missing"
+    if index["type"] != index_type:
+        return f"index type is {index['type']}, configured {index_type}"
+    if index_type == "ivfflat":
+        built, ideal = index["lists"] or 1, ideal_ivfflat_lists(row_count)
+        if max(built, ideal) / min(built, ideal) >= IVFFLAT_RETRAIN_FACTOR:
+            return f"ivfflat trained with {built} lists, {row_count} rows call for {ideal}"
+    return None
+
+
+def rebuild_index(engine: sa.engine.Engine, index_type: str = VECTOR_INDEX_TYPE, force: bool = False,
+                  dry_run: bool = False) -> Dict:
+    """Rebuild (or retrain) the chunk embedding index when it is missing or stale.
+
+    IVFFlat centroids are trained at build time, so the index is rebuilt once
+    the row count calls for a substantially different number of lists. The new
+    index is built concurrently under a temporary name and swapped in, so
+    searches keep using the old one until the new one is ready.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        row_count = connection.execute(
+            sa.text("SELECT count(*) FROM chunks WHERE embedding IS NOT NULL")
+        ).scalar()
+        index = describe_index(connection)
+        reason = "forced" if force else needs_rebuild(index, index_type, row_count)
+
+        status = {"rows": row_count, "index": index, "rebuilt": False, "reason": reason}
+        if reason is None or dry_run:
+            return status
+
+        temporary_name = f"{VECTOR_INDEX_NAME}_new"
+        logger.info("Rebuilding %s as %s (%s)", VECTOR_INDEX_NAME, index_type, reason)
+        connection.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {temporary_name}"))
+        connection.execute(sa.text(create_index_sql(index_type, row_count, name=temporary_name, concurrently=True)))
+        connection.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {VECTOR_INDEX_NAME}"))
+        connection.execute(sa.text(f"ALTER INDEX {temporary_name} RENAME TO {VECTOR_INDEX_NAME}"))
+
+        status.update(rebuilt=True, index=describe_index(connection))
+        return status
+
+
+def conversation_index_name(conversation_id: int) -> str:
+    """Name of the partial vector index of a conversation"""
+    return f"{CONVERSATION_INDEX_PREFIX}{int(conversation_id)}_idx"
+
+
+def ensure_conversation_index(engine: sa.engine.Engine, conversation_id: int, index_type: str = VECTOR_INDEX_TYPE,
+                              min_chunks: int = CONVERSATION_INDEX_MIN_CHUNKS) -> bool:
+    """Create the partial vector index of one conversation once it reaches ``min_chunks``.
+
+    Called at ingest, before the conversation's new ``chunk_count`` is
+    committed, so a conversation is never searched without both its exact
+    scan and its partial index. The index is built concurrently; the caller
+    must not hold an open transaction. Returns whether an index was created.
+    """
+    name = conversation_index_name(conversation_id)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        count = connection.execute(
+            sa.text("SELECT count(*) FROM chunks WHERE conversation_id = :conversation_id AND embedding IS NOT NULL"),
+            {"conversation_id": conversation_id}
+        ).scalar()
+        if count < min_chunks:
+            return False
+        valid = connection.execute(
+            sa.text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+            {"name": name}
+        ).scalar()
+        if valid:
+            return False
+
+        logger.info("Creating partial vector index %s (%s chunks)", name, count)
+        if valid is not None:  # A failed concurrent build left an invalid index behind
+            connection.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        connection.execute(sa.text(create_index_sql(
+            index_type, count, name=name, concurrently=True, conversation_id=conversation_id
+        )))
+        return True
+
+
+def ensure_conversation_indexes(engine: sa.engine.Engine, index_type: str = VECTOR_INDEX_TYPE,
+                                min_chunks: int = CONVERSATION_INDEX_MIN_CHUNKS, dry_run: bool = False) -> Dict:
+    """Create partial vector indexes for large conversations and drop stale ones.
+
+    Retrieval always filters on ``conversation_id``. Small conversations are
+    served by an exact scan through the ``conversation_id`` btree index, while
+    conversations above ``min_chunks`` get a partial ANN index so their searches
+    never walk other conversations' neighbours. Ingestion creates these as
+    conversations grow (see ``ensure_conversation_index``); this catches up on
+    conversations ingested before that, and drops partial indexes whose
+    conversation no longer has chunks.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        counts = dict(connection.execute(sa.text(
+            "SELECT conversation_id, count(*) FROM chunks WHERE embedding IS NOT NULL GROUP BY conversation_id"
+        )).all())
+        existing = set(connection.execute(
+            sa.text("SELECT indexname FROM pg_indexes WHERE tablename = 'chunks' AND indexname LIKE :prefix"),
+            {"prefix": f"{CONVERSATION_INDEX_PREFIX}%"}
+        ).scalars())
+
+        wanted = {
+            conversation_index_name(conversation_id): conversation_id
+            for conversation_id, count in counts.items()
+            if count >= min_chunks
+        }
+        created = sorted(set(wanted) - existing)
+        dropped = sorted(existing - set(wanted) - {
+            # Keep indexes of conversations that still have chunks but shrank
+            conversation_index_name(conversation_id) for conversation_id in counts
+        })
+
+        if not dry_run:
+            for name in created:
+                conversation_id = wanted[name]
+                logger.info("Creating partial vector index %s", name)
+                connection.execute(sa.text(create_index_sql(
+                    index_type, counts[conversation_id], name=name, concurrently=True, conversation_id=conversation_id
+                )))
+            for name in dropped:
+                logger.info("Dropping stale partial vector index %s", name)
+                connection.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+        return {"created": created, "dropped": dropped}
+
+
+def apply_search_settings(db: Session, ef_search: Optional[int] = None, probes: Optional[int] = None):
+    """Set the per-query recall knobs for the current transaction.
+
+    ``hnsw.ef_search`` and ``ivfflat.probes`` trade recall against latency;
+    ``SET LOCAL`` keeps them scoped to this request's transaction. Falls back to
+    ``HNSW_EF_SEARCH`` / ``IVFFLAT_PROBES`` and leaves the server defaults alone
+    when neither is configured.
+    """
+    ef_search = ef_search or HNSW_EF_SEARCH
+    probes = probes or IVFFLAT_PROBES
+    # SET does not take bind parameters; the values are validated as integers
+    if ef_search:
+        db.execute(sa.text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+    if probes:
+        db.execute(sa.text(f"SET LOCAL ivfflat.probes = {int(probes)}"))
+
+
+def use_exact_search(chunk_count: int, min_chunks: int = CONVERSATION_INDEX_MIN_CHUNKS) -> bool:
+    """Whether a conversation of ``chunk_count`` embedded chunks is searched exactly.
+
+    Conversations below ``min_chunks`` have no partial index, and the global
+    index would find neighbours from every conversation and filter them
+    afterwards, so they are scanned exactly instead.
+    """
+    return chunk_count < min_chunks
@@ -0,0 +1,70 @@
+from collections import defaultdict
+from typing import Dict, List
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.models import Chunk
+
+# Neighbours kept per chunk and relationship; expansion only ever takes the
+# first few that are not already in the context
+NEIGHBOR_LIST_SIZE = 8
+
+
+def assign_chunk_ids(chunks: List[Chunk], db: Session):
+    """Reserve primary keys for new chunks from the id sequence.
+
+    Neighbour lists reference chunk ids, so they are assigned before the
+    chunks are inserted; this keeps ingestion to a single INSERT per chunk
+    instead of an INSERT followed by an UPDATE.
+    """
+    ids = db.execute(
+        sa.text("SELECT nextval(pg_get_serial_sequence('chunks', 'id')) FROM generate_series(1, :count)"),
+        {"count": len(chunks)}
+    ).scalars().all()
+    for chunk, chunk_id in zip(chunks, ids):
+        chunk.id = chunk_id
+
+
+def link_chunk_neighbors(chunks: List[Chunk]):
+    """Store the structural neighbours of each chunk of one document.
+
+    ``chunks`` must have ids and be in sequence order. For every chunk this
+    records the other chunks of its semantic group (most important first, then
+    in document order) and of its paragraph (in document order), the previous
+    and next chunks, and the header chunk of its section. These are the
+    orderings the keyed fallback of ``context_expansion._fetch_candidates``
+    uses, so a document expands the same way whether or not it has lists.
+    """
+    def ranked(members: List[Chunk]) -> List[Chunk]:
+        return sorted(members, key=lambda c: (-(c.importance_score or 0.0), c.sequence_number))
+
+    semantic_groups: Dict[str, List[Chunk]] = defaultdict(list)
+    paragraphs: Dict[int, List[Chunk]] = defaultdict(list)
+    for chunk in chunks:
+        if chunk.semantic_group:
+            semantic_groups[chunk.semantic_group].append(chunk)
+        if chunk.paragraph_id:
+            paragraphs[chunk.paragraph_id].append(chunk)
+    semantic_groups = {key: ranked(members) for key, members in semantic_groups.items()}
+    # Paragraph members are already in sequence order
+
+    def others(members: List[Chunk], chunk: Chunk) -> List[int]:
+        return [member.id for member in members if member is not chunk][:NEIGHBOR_LIST_SIZE]
+
+    section_header = None
+    for i, chunk in enumerate(chunks):
+        if chunk.is_section_header:
+            section_header = chunk
+
+        chunk.semantic_neighbor_ids = others(semantic_groups.get(chunk.semantic_group, []), chunk)
+        chunk.paragraph_neighbor_ids = others(paragraphs.get(chunk.paragraph_id, []), chunk)
+        chunk.adjacent_neighbor_ids = [
+            neighbor.id for neighbor in (chunks[i - 1] if i > 0 else None, chunks[i + 1] if i + 1 < len(chunks) else None)
+            if neighbor is not None
+        ]
+        chunk.header_chunk_id = (
+            section_header.id
+            if section_header is not None and not chunk.is_section_header and chunk.section_title
+            else None
+        )
@@ -0,0 +1,179 @@
+import logging
+import os
+import re
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.models import Chunk, Document, ModelConfig, Turn
+
+logger = logging.getLogger(__name__)
+
+# Context windows (in tokens) by model id prefix; the longest matching prefix wins
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4-32k": 32_768,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo-16k": 16_385,
+    "gpt-3.5-turbo": 4_096,
+    "claude-3": 200_000,
+    "claude-2": 100_000,
+    "deepseek": 64_000,
+}
+DEFAULT_CONTEXT_WINDOW = 8_192
+
+# Upper bound on the user context, regardless of the model's window (0 disables)
+MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", "6000"))
+CONTEXT_SAFETY_MARGIN = 0.1  # Fraction of the window left unused to absorb estimation error
+RECENT_TURNS_RESERVED = 2  # Most recent turns placed ahead of the document chunks
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Offline token estimate for budgeting prompts.
+
+    Punctuation marks count as one token each and words as one token per five
+    characters (at least one). This slightly overestimates BPE tokenizers on
+    English text, which is the safe direction for a budget.
+    """
+    return sum(max(1, (len(piece) + 4) // 5) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def context_window(model_id: str) -> int:
+    """Context window of ``model_id``, or ``DEFAULT_CONTEXT_WINDOW`` if unknown"""
+    model_id = (model_id or "").lower()
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model_id.startswith(prefix)]
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+def context_budget(model_config: ModelConfig, system_prompt: str) -> int:
+    """Tokens available for the user context of one request to ``model_config``.
+
+    The model's window minus the completion (``max_tokens``), the system prompt
+    and a safety margin, capped at ``MAX_CONTEXT_TOKENS``.
+    """
+    window = context_window(model_config.model_id)
+    budget = int(window * (1 - CONTEXT_SAFETY_MARGIN)) - (model_config.max_tokens or 0) - count_tokens(system_prompt)
+    if MAX_CONTEXT_TOKENS:
+        budget = min(budget, MAX_CONTEXT_TOKENS)
+    return max(budget, 0)
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut ``text`` to roughly ``tokens`` tokens at a word boundary"""
+    if tokens <= 0:
+        return ""
+    pieces = list(_TOKEN_PATTERN.finditer(text))
+    used = 0
+    for piece in pieces:
+        used += max(1, (len(piece.group()) + 4) // 5)
+        if used > tokens:
+            return text[:piece.start()].rstrip() + " ..."
+    return text
+
+
+def build_context(conversation_name: str, previous_turns: Sequence[Turn], chunks: Sequence[Chunk],
+                  db: Session, budget: int, summary: Optional[str] = None,
+                  summarized_through: int = 0) -> Dict:
+    """Assemble the user context of a turn within ``budget`` tokens.
+
+    Sections are filled by priority: the conversation header, the most recent
+    ``RECENT_TURNS_RESERVED`` turns (the latest one is truncated rather than
+    dropped), the retrieved document chunks in the given order, then older turns
+    from newest to oldest. Items that do not fit are skipped. The result keeps
+    the usual layout (turns in order, then chunks), and chunk filenames are
+    loaded with a single joined query.
+
+    ``summary`` is a compacted history of the turns up to ``summarized_through``
+    (see ``history_compaction``). It follows the header, and is truncated to
+    the space left after the recent turns if it does not fit whole. Turns it
+    covers are skipped if passed in ``previous_turns``, and are not counted as
+    omitted: only turns dropped for lack of budget are.
+
+    Returns ``{"text", "tokens", "budget", "summary", "turns", "chunks",
+    "omitted_turns", "omitted_chunks"}``.
+    """
+    header = f"Conversation: {conversation_name}\n\n"
+    used = count_tokens(header)
+
+    if summary and summarized_through:
+        previous_turns = [turn for turn in previous_turns if turn.turn_number > summarized_through]
+
+    filenames = {}
+    if chunks:
+        filenames = dict(db.query(Chunk.id, Document.filename).join(
+            Document, Document.id == Chunk.document_id
+        ).filter(
+            Chunk.id.in_([chunk.id for chunk in chunks])
+        ).all())
+
+    def fits(text: str) -> bool:
+        nonlocal used
+        tokens = count_tokens(text)
+        if used + tokens > budget:
+            return False
+        used += tokens
+        return True
+
+    turn_texts: Dict[int, str] = {}
+    chunk_texts: Dict[int, str] = {}
+    summary_text = ""
+    recent = list(previous_turns[-RECENT_TURNS_RESERVED:])
+    older = list(previous_turns[:-RECENT_TURNS_RESERVED]) if len(previous_turns) > RECENT_TURNS_RESERVED else []
+
+    for turn in reversed(recent):
+        text = f"Turn {turn.turn_number}: {turn.response}\n\n"
+        if fits(text):
+            turn_texts[turn.turn_number] = text
+        elif turn is previous_turns[-1]:
+            # The turn being responded to is always included, if only in part
+            text = f"Turn {turn.turn_number}: {truncate_to_tokens(turn.response, budget - used - 10)}\n\n"
+            used += count_tokens(text)
+            turn_texts[turn.turn_number] = text
+
+    if summary:
+        summary_text = f"Summary of earlier turns:\n{summary}\n\n"
+        if not fits(summary_text):
+            remaining = budget - used - 10
+            summary_text = ""
+            if remaining > 0:
+                summary_text = f"Summary of earlier turns:\n{truncate_to_tokens(summary, remaining)}\n\n"
+                used += count_tokens(summary_text)
+
+    for chunk in chunks:
+        filename = filenames.get(chunk.id, "Unknown")
+        text = f"From {filename}, chunk {chunk.sequence_number}: {chunk.content}\n\n"
+        if fits(text):
+            chunk_texts[chunk.id] = text
+
+    for turn in reversed(older):
+        text = f"Turn {turn.turn_number}: {turn.response}\n\n"
+        if fits(text):
+            turn_texts[turn.turn_number] = text
+
+    parts = [header, summary_text]
+    if turn_texts:
+        parts.append("Previous turns:\n")
+        # Turns dropped for budget; those covered by the summary are not missing
+        omitted = len(previous_turns) - len(turn_texts)
+        if omitted:
+            parts.append(f"({omitted} earlier turns omitted)\n\n")
+        parts.extend(turn_texts[turn.turn_number] for turn in previous_turns if turn.turn_number in turn_texts)
+    if chunk_texts:
+        parts.append("Relevant document chunks:\n")
+        parts.extend(chunk_texts[chunk.id] for chunk in chunks if chunk.id in chunk_texts)
+
+    result = {
+        "text": "".join(parts),
+        "tokens": used,
+        "budget": budget,
+        "summary": bool(summary_text),
+        "turns": len(turn_texts),
+        "chunks": len(chunk_texts),
+        "omitted_turns": len(previous_turns) - len(turn_texts),
+        "omitted_chunks": len(chunks) - len(chunk_texts),
+    }
+    logger.debug("Built context: %s", {key: value for key, value in result.items() if key != "text"})
+    return result
@@ -0,0 +1,199 @@
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session, aliased, defer
+
+from app.models import Chunk
+
+# Expansion configuration
+SEMANTIC_CONTEXT_SIZE = 2   # Chunks added from the same semantic group
+PARAGRAPH_CONTEXT_SIZE = 2  # Chunks added from the same paragraph
+
+# Sources reported for each chunk in the expanded result
+SOURCE_BASE = "base"
+SOURCE_SEMANTIC = "semantic"
+SOURCE_PARAGRAPH = "paragraph"
+SOURCE_ADJACENT = "adjacent"
+SOURCE_HEADER = "header"
+
+# Columns selected for candidate chunks; the vectors are large and only needed for re-ranking
+_CONTEXT_COLUMNS = [column for column in Chunk.__table__.c if column.key not in ("embedding", "search_vector")]
+
+
+def _fetch_candidates(base_chunks: List[Chunk], db: Session, cap: int,
+                      with_embeddings: bool = False) -> Dict[str, Dict[tuple, List[Chunk]]]:
+    """Fetch every neighbour candidate for the whole hit set in one query.
+
+    The query is a UNION ALL of keyed lookups, one branch per expansion kind.
+    Each branch ranks its rows within their key (e.g. document and semantic
+    group) in the order the expansion consumes them, and only the first ``cap``
+    rows per key are returned. Embeddings are only selected ``with_embeddings``.
+
+    Returns ``{source: {key: [chunks in rank order]}}``.
+    """
+    semantic_keys = {(c.document_id, c.semantic_group) for c in base_chunks if c.semantic_group}
+    paragraph_keys = {(c.document_id, c.paragraph_id) for c in base_chunks if c.paragraph_id}
+    adjacent_keys = {
+        (c.document_id, c.sequence_number + offset) for c in base_chunks for offset in (-1, 1)
+    }
+    header_keys = {
+        (c.document_id, c.section_title)
+        for c in base_chunks
+        if not c.is_section_header and c.section_title
+    }
+
+    columns = _CONTEXT_COLUMNS + [Chunk.embedding] if with_embeddings else _CONTEXT_COLUMNS
+
+    def branch(source, keys, key, order, *criteria):
+        return sa.select(
+            *columns,
+            sa.literal(source).label("source"),
+            sa.func.row_number().over(partition_by=(Chunk.document_id, key), order_by=order).label("rank"),
+        ).where(
+            sa.tuple_(Chunk.document_id, key).in_(list(keys)),
+            *criteria
+        )
+
+    branches = []
+    if semantic_keys:
+        branches.append(branch(
+            SOURCE_SEMANTIC, semantic_keys, Chunk.semantic_group, (Chunk.importance_score.desc(), Chunk.id),
+        ))
+    if paragraph_keys:
+        branches.append(branch(
+            SOURCE_PARAGRAPH, paragraph_keys, Chunk.paragraph_id, (Chunk.sequence_number, Chunk.id),
+        ))
+    branches.append(branch(
+        SOURCE_ADJACENT, adjacent_keys, Chunk.sequence_number, (Chunk.id,),
+    ))
+    if header_keys:
+        branches.append(branch(
+            SOURCE_HEADER, header_keys, Chunk.section_title, (Chunk.sequence_number, Chunk.id),
+            Chunk.is_section_header.is_(True),
+        ))
+
+    candidates = sa.union_all(*branches).subquery()
+    candidate_chunk = aliased(Chunk, candidates)
+
+    query = db.query(candidate_chunk, candidates.c.source)
+    if not with_embeddings:
+        query = query.options(defer(candidate_chunk.embedding))  # Not selected by the branches
+    rows = query.filter(
+        candidates.c.rank <= cap
+    ).order_by(
+        candidates.c.source, candidates.c.rank
+    ).all()
+
+    # Each branch is keyed by one of the chunk's own columns
+    key_columns = {
+        SOURCE_SEMANTIC: "semantic_group",
+        SOURCE_PARAGRAPH: "paragraph_id",
+        SOURCE_ADJACENT: "sequence_number",
+        SOURCE_HEADER: "section_title",
+    }
+
+    grouped: Dict[str, Dict[tuple, List[Chunk]]] = defaultdict(lambda: defaultdict(list))
+    for chunk, source in rows:
+        grouped[source][(chunk.document_id, getattr(chunk, key_columns[source]))].append(chunk)
+
+    return grouped
+
+
+def _fetch_linked_candidates(base_chunks: List[Chunk], db: Session,
+                             with_embeddings: bool = False) -> Callable[[Chunk, str], List[Chunk]]:
+    """Fetch the precomputed neighbours of the whole hit set by primary key.
+
+    Returns a lookup of ``(base chunk, source)`` to its pre-ranked neighbours.
+    """
+    def neighbor_ids(chunk: Chunk, source: str) -> List[int]:
+        if source == SOURCE_SEMANTIC:
+            return chunk.semantic_neighbor_ids or []
+        if source == SOURCE_PARAGRAPH:
+            return chunk.paragraph_neighbor_ids or []
+        if source == SOURCE_ADJACENT:
+            return chunk.adjacent_neighbor_ids or []
+        return [chunk.header_chunk_id] if chunk.header_chunk_id else []
+
+    sources = (SOURCE_SEMANTIC, SOURCE_PARAGRAPH, SOURCE_ADJACENT, SOURCE_HEADER)
+    ids = {neighbor_id for chunk in base_chunks for source in sources for neighbor_id in neighbor_ids(chunk, source)}
+    fetched = {}
+    if ids:
+        query = db.query(Chunk)
+        if not with_embeddings:
+            query = query.options(defer(Chunk.embedding))  # Not needed for context, and large
+        fetched = {chunk.id: chunk for chunk in query.filter(Chunk.id.in_(ids))}
+
+    def lookup(chunk: Chunk, source: str) -> List[Chunk]:
+        return [fetched[neighbor_id] for neighbor_id in neighbor_ids(chunk, source) if neighbor_id in fetched]
+
+    return lookup
+
+
+def expand_chunk_context(base_chunks: List[Chunk], db: Session, limit: int,
+                         with_embeddings: bool = False) -> List[Tuple[Chunk, str]]:
+    """Add structural context around vector search hits, up to ``limit`` chunks.
+
+    For each base chunk, in order, this adds (skipping chunks already included):
+    the most important chunks of the same semantic group, the first chunks of
+    the same paragraph, the adjacent chunks (N-1, N+1) and the section header.
+    Neighbours are precomputed at ingest (see ``chunk_graph``), so all
+    candidates are a single primary-key fetch; chunks ingested before the
+    neighbour lists existed fall back to a single keyed query (see
+    ``_fetch_candidates``). The selection is done in memory. The added chunks'
+    embeddings are only loaded ``with_embeddings`` (e.g. for MMR re-ranking).
+
+    Returns ``(chunk, source)`` pairs, base chunks first, labelled with the
+    ``SOURCE_*`` constant that contributed them.
+    """
+    result = [(chunk, SOURCE_BASE) for chunk in base_chunks]
+    included_chunk_ids = {chunk.id for chunk in base_chunks}
+
+    if not base_chunks or len(result) >= limit:
+        return result
+
+    if all(chunk.adjacent_neighbor_ids is not None for chunk in base_chunks):
+        neighbors = _fetch_linked_candidates(base_chunks, db, with_embeddings)
+    else:
+        # Selections skip included chunks, of which there are at most ``limit``, so
+        # this many candidates per key is always enough
+        candidates = _fetch_candidates(base_chunks, db, cap=limit + max(SEMANTIC_CONTEXT_SIZE, PARAGRAPH_CONTEXT_SIZE),
+                                       with_embeddings=with_embeddings)
+        keys = {
+            SOURCE_SEMANTIC: lambda chunk: [(chunk.document_id, chunk.semantic_group)],
+            SOURCE_PARAGRAPH: lambda chunk: [(chunk.document_id, chunk.paragraph_id)],
+            SOURCE_ADJACENT: lambda chunk: [
+                (chunk.document_id, chunk.sequence_number - 1), (chunk.document_id, chunk.sequence_number + 1)
+            ],
+            SOURCE_HEADER: lambda chunk: [(chunk.document_id, chunk.section_title)],
+        }
+
+        def neighbors(chunk: Chunk, source: str) -> List[Chunk]:
+            return [candidate for key in keys[source](chunk) for candidate in candidates[source][key]]
+
+    def add(chunks: List[Chunk], source: str, count: int = None):
+        # Pick from the chunks that were not included when this step started,
+        # then add them while there is room
+        picked = [chunk for chunk in chunks if chunk.id not in included_chunk_ids][:count]
+        for chunk in picked:
+            if chunk.id not in included_chunk_ids and len(result) < limit:
+                result.append((chunk, source))
+                included_chunk_ids.add(chunk.id)
+
+    for chunk in base_chunks:
+        # Add context from the same semantic group
+        if chunk.semantic_group:
+            add(neighbors(chunk, SOURCE_SEMANTIC), SOURCE_SEMANTIC, SEMANTIC_CONTEXT_SIZE)
+
+        # Add context from the same paragraph
+        if chunk.paragraph_id:
+            add(neighbors(chunk, SOURCE_PARAGRAPH), SOURCE_PARAGRAPH, PARAGRAPH_CONTEXT_SIZE)
+
+        # Add adjacent chunks (N-1, N+1)
+        add(neighbors(chunk, SOURCE_ADJACENT), SOURCE_ADJACENT)
+
+        # Add section header if this chunk is not a header itself
+        if not chunk.is_section_header and chunk.section_title:
+            add(neighbors(chunk, SOURCE_HEADER), SOURCE_HEADER, 1)
+
+    return result
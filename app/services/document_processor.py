@@ -1,20 +1,54 @@
 import asyncio
 import logging
+import os
 import re
-from typing import List, Dict
+import multiprocessing
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Callable, Iterator, List, Dict, NamedTuple, Optional, Tuple
 
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-import spacy
-
 from app.models import Document, Chunk
-from app.services.embedding_service import generate_embedding
+from app.services.chunk_graph import assign_chunk_ids, link_chunk_neighbors
+from app.services.document_sources import iter_source_segments
+from app.services.embedding_service import generate_embeddings
+
+if TYPE_CHECKING:
+    from spacy.language import Language
+    from spacy.tokens import Doc
 
 logger = logging.getLogger(__name__)
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
+# Components structure extraction never reads (sentences, entities and noun
+# chunks need the tagger, parser and NER only)
+SPACY_EXCLUDED_COMPONENTS = ["lemmatizer"]
+
+# spaCy model, loaded on first use (see get_nlp) so importing the app stays fast
+SPACY_MODEL = "en_core_web_sm"
+SPACY_WARMUP = os.getenv("SPACY_WARMUP", "false").lower() == "true"  # Load the model in the background at startup
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+# Parsing configuration
+PARSE_WINDOW_CHARS = int(os.getenv("PARSE_WINDOW_CHARS", "100000"))  # Larger texts are parsed in paragraph windows
+
+MIN_PARALLEL_WINDOW_CHARS = 20000  # Smallest window worth parsing in a pool worker of its own
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# Process-pool ingestion: parse and chunk documents in this many worker
+# processes, shared by all ingestion jobs of the calling process (0 parses in
+# a thread of the calling process)
+INGESTION_PROCESSES = int(os.getenv("INGESTION_PROCESSES", "0"))
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
 
 # Chunking configuration
 MAX_CHUNK_SIZE = 512  # Maximum number of characters per chunk
@@ -23,54 +57,304 @@ OVERLAP_SIZE = 50     # Number of characters to overlap between chunks
 
 # Batch configuration
 CHUNK_BATCH_SIZE = 100  # Number of chunks to insert per transaction
-EMBED_BATCH_SIZE = 10   # Number of embeddings to generate in parallel
+EMBED_PIPELINE_BATCH_SIZE = 256  # Chunks handed to the embedding service at a time during chunking
+EMBED_PIPELINE_CONCURRENCY = 2   # Embedding batches in flight at once per document
+
+
+class StructureState(NamedTuple):
+    """Document structure still open at the end of a text segment, carried into the next one"""
+    paragraph_start: int = 1            # Id of the segment's first paragraph
+    open_section: Optional[str] = None  # Title of the section the previous segment ended in
+    section_started: bool = False       # Whether that section already had sentences
+
+
+class ChunkRecord(NamedTuple):
+    """Column values of one chunk, as produced by chunking (picklable, no ORM state)"""
+    sequence_number: int
+    content: str
+    section_title: Optional[str]
+    is_section_header: bool
+    paragraph_id: Optional[int]
+    semantic_group: Optional[str]
+    importance_score: float
+
+
+def get_nlp() -> "Language":
+    """Return the spaCy pipeline, loading it on first use.
+
+    Loading takes about a second, so it is deferred until a document is
+    actually parsed rather than paid by every process that imports the app.
+    """
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+
+                started = time.perf_counter()
+                _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDED_COMPONENTS)
+                logger.info("Loaded spaCy model %s in %.2fs", SPACY_MODEL, time.perf_counter() - started)
+    return _nlp
+
+
+async def warm_up_nlp():
+    """Load the spaCy model in a background thread if ``SPACY_WARMUP`` is set.
+
+    In process-pool mode the model is only needed by the pool's workers, which
+    load it when they start.
+    """
+    if SPACY_WARMUP and INGESTION_PROCESSES <= 0:
+        await asyncio.to_thread(get_nlp)
+
+
+def _init_chunking_worker():
+    """Load the spaCy model once when a pool worker process starts"""
+    get_nlp()
+
 
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the chunking process pool, starting it on first use.
 
-async def process_document(document_id: int, db: Session) -> int:
+    Workers are spawned rather than forked so they do not inherit the event
+    loop, threads or database connections of the calling process.
+    """
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=INGESTION_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_chunking_worker
+                )
+    return _process_pool
+
+
+def _reset_process_pool(pool: ProcessPoolExecutor):
+    """Discard ``pool`` after one of its workers died, so the next job starts a new one"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_process_pool():
+    """Stop the chunking process pool, if it was started"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+def chunk_text(text: str, sequence_start: int = 1,
+               state: StructureState = StructureState()) -> Tuple[List[ChunkRecord], StructureState]:
+    """Parse and chunk a document's text into plain chunk records.
+
+    This is the CPU-bound part of ingestion; in process-pool mode it runs in a
+    worker process and only the text and the records cross the process
+    boundary.
+
+    ``state`` is the structure left open by the previous segment of the same
+    document; the state at the end of this text is returned with the records.
+    """
+    return _chunk_doc(parse_document(text), sequence_start, state)
+
+
+def parse_window(text: str) -> bytes:
+    """Parse one window of a text in a pool worker and return the serialized ``Doc``"""
+    return get_nlp()(text).to_bytes(exclude=["user_data", "tensor"])
+
+
+def chunk_parsed_windows(windows: List[bytes], sequence_start: int = 1,
+                         state: StructureState = StructureState()) -> Tuple[List[ChunkRecord], StructureState]:
+    """Stitch the serialized window docs of ``parse_window`` back together, in order, and chunk them"""
+    from spacy.tokens import Doc
+
+    vocab = get_nlp().vocab
+    doc = Doc.from_docs([Doc(vocab).from_bytes(window) for window in windows], ensure_whitespace=False)
+    return _chunk_doc(doc, sequence_start, state)
+
+
+def _chunk_doc(doc: "Doc", sequence_start: int, state: StructureState) -> Tuple[List[ChunkRecord], StructureState]:
+    """Extract the structure of a parsed text and build its chunk records"""
+    sections, paragraphs, semantic_groups, next_state = extract_segment_structure(doc, state)
+    return list(iter_chunk_records(doc, sections, paragraphs, semantic_groups, sequence_start)), next_state
+
+
+async def chunk_text_in_pool(pool: ProcessPoolExecutor, text: str, sequence_start: int = 1,
+                             state: StructureState = StructureState()) -> Tuple[List[ChunkRecord], StructureState]:
+    """Parse and chunk ``text`` in the process pool, using its workers in parallel.
+
+    The text is split at paragraph breaks into about one window per worker
+    (at most ``PARSE_WINDOW_CHARS`` and at least ``MIN_PARALLEL_WINDOW_CHARS``
+    characters each). The windows are parsed concurrently, so parsing a large
+    text takes about ``1 / INGESTION_PROCESSES`` of the time it takes in one
+    process, and one more worker call stitches and chunks the parsed windows.
+    """
+    loop = asyncio.get_running_loop()
+    window_chars = max(MIN_PARALLEL_WINDOW_CHARS, min(PARSE_WINDOW_CHARS, -(-len(text) // INGESTION_PROCESSES)))
+    windows = split_parse_windows(text, window_chars)
+    if len(windows) == 1:
+        return await loop.run_in_executor(pool, chunk_text, text, sequence_start, state)
+
+    parsed = await asyncio.gather(*(loop.run_in_executor(pool, parse_window, window) for window in windows))
+    return await loop.run_in_executor(pool, chunk_parsed_windows, parsed, sequence_start, state)
+
+
+async def process_document(document_id: int, db: Session,
+                           progress: Optional[Callable[[int, Optional[int]], None]] = None) -> int:
     """Process a document by chunking it and generating embeddings.
 
     The function processes large documents in smaller batches to reduce memory
-    usage and avoid partial database writes. Embeddings are generated
-    asynchronously with limited parallelism."""
+    usage and avoid partial database writes. Embeddings are generated through
+    the batched embedding API with limited request parallelism.
+
+    Documents uploaded as a spooled file (``source_path``) are extracted
+    incrementally and processed one text segment at a time, so memory stays
+    bounded by the segment size rather than the document size. Paragraph ids
+    and the open section carry over from one segment to the next (see
+    ``StructureState``); structural neighbours are linked within each segment.
+
+    ``progress(chunks_embedded, chunks_total)`` is called as embedding batches
+    complete; ``chunks_total`` is None until chunking has finished."""
 
     document = db.query(Document).filter(Document.id == document_id).first()
     if not document:
         raise ValueError(f"Document with ID {document_id} not found")
+    conversation_id = document.conversation_id
+
+    if document.content is not None:
+        segments = iter([document.content])
+    elif document.source_path:
+        segments = iter_source_segments(document.source_path)
+    else:
+        raise ValueError(f"Document with ID {document_id} has neither content nor a source file to ingest")
+
+    chunk_count = 0
+    embedded_before = 0
+    state = StructureState()
+    # Extract the next segment ahead, so the last one is known when it starts
+    segment = await asyncio.to_thread(next, segments, None)
+    while segment is not None:
+        next_segment = await asyncio.to_thread(next, segments, None)
+        is_last = next_segment is None
+
+        def report(embedded: int, total: Optional[int]):
+            if progress is not None:
+                progress(embedded_before + embedded,
+                         chunk_count + total if is_last and total is not None else None)
+
+        segment_chunks, state = await _ingest_segment(segment, document_id, conversation_id, db,
+                                                      sequence_start=chunk_count + 1, state=state,
+                                                      progress=report)
+        chunk_count += segment_chunks
+        embedded_before += segment_chunks
+        segment = next_segment
+
+    if chunk_count == 0 and progress is not None:
+        progress(0, 0)
+    return chunk_count
 
-    # Offload spaCy processing to a background thread. This keeps the event loop
-    # responsive and allows for streaming/large document handling.
-    doc = await asyncio.to_thread(nlp, document.content)
 
-    sections = extract_document_sections(doc)
-    paragraphs = extract_paragraphs(doc)
-    semantic_groups = identify_semantic_groups(doc)
+async def _ingest_segment(text: str, document_id: int, conversation_id: int, db: Session,
+                          sequence_start: int = 1, state: StructureState = StructureState(),
+                          progress: Optional[Callable[[int, Optional[int]], None]] = None
+                          ) -> Tuple[int, StructureState]:
+    """Chunk, embed and store one segment of a document's text.
 
-    chunks = create_semantic_chunks(
-        doc=doc,
-        document_id=document_id,
-        sections=sections,
-        paragraphs=paragraphs,
-        semantic_groups=semantic_groups,
-    )
+    Returns the number of chunks stored and the structure state at the end of
+    the segment.
+    """
+    if INGESTION_PROCESSES > 0:
+        # Parse and chunk in the process pool, so large documents and several
+        # documents use several cores and none of the work competes with
+        # request handling here
+        pool = get_process_pool()
+        try:
+            records, next_state = await chunk_text_in_pool(pool, text, sequence_start, state)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for running out of memory) and the pool
+            # rejects all further work; replace it and let the job be retried
+            logger.error("Chunking process pool broke while ingesting document %s; restarting it", document_id)
+            _reset_process_pool(pool)
+            raise
+        new_chunks = (Chunk(document_id=document_id, **record._asdict()) for record in records)
+    else:
+        # Offload spaCy processing to a background thread. This keeps the event
+        # loop responsive.
+        doc = await asyncio.to_thread(parse_document, text)
+
+        sections, paragraphs, semantic_groups, next_state = extract_segment_structure(doc, state)
+        new_chunks = iter_semantic_chunks(
+            doc=doc,
+            document_id=document_id,
+            sections=sections,
+            paragraphs=paragraphs,
+            semantic_groups=semantic_groups,
+            sequence_start=sequence_start,
+        )
 
-    # Semaphore limits concurrent embedding requests
-    semaphore = asyncio.Semaphore(EMBED_BATCH_SIZE)
+    # Embed chunks batch by batch while the rest of the document is still being
+    # chunked; ``generate_embeddings`` packs each batch into multi-input
+    # provider requests, so this costs a handful of round-trips rather than
+    # one per chunk.
+    chunks = []
+    embedding_tasks = []
+    semaphore = asyncio.Semaphore(EMBED_PIPELINE_CONCURRENCY)
+    embedded = 0
+    total = None
 
-    async def embed_chunk(chunk: Chunk):
+    async def embed_batch(batch: List[Chunk]) -> List[List[float]]:
+        nonlocal embedded
         async with semaphore:
-            try:
-                chunk.embedding = await generate_embedding(chunk.content)
-            except Exception as e:  # noqa: BLE001
-                logger.exception("Embedding generation failed for chunk %s: %s", chunk.sequence_number, e)
-                raise
+            embeddings = await generate_embeddings([chunk.content for chunk in batch])
+        embedded += len(batch)
+        if progress is not None:
+            progress(embedded, total)
+        return embeddings
+
+    try:
+        pending = []
+        for chunk in new_chunks:
+            chunks.append(chunk)
+            pending.append(chunk)
+            if len(pending) >= EMBED_PIPELINE_BATCH_SIZE:
+                embedding_tasks.append(asyncio.create_task(embed_batch(pending)))
+                pending = []
+                await asyncio.sleep(0)  # Let the batch's request start before chunking on
+        total = len(chunks)
+        if pending:
+            embedding_tasks.append(asyncio.create_task(embed_batch(pending)))
+        elif progress is not None and total:
+            progress(embedded, total)
+
+        embeddings = [
+            embedding
+            for batch_embeddings in await asyncio.gather(*embedding_tasks)
+            for embedding in batch_embeddings
+        ]
+    except Exception as e:  # noqa: BLE001
+        for task in embedding_tasks:
+            task.cancel()
+        logger.exception("Embedding generation failed for document %s: %s", document_id, e)
+        raise
+
+    for chunk, embedding in zip(chunks, embeddings):
+        chunk.embedding = embedding
+        chunk.conversation_id = conversation_id
+
+    # Record each chunk's structural neighbours so retrieval can expand context
+    # with a primary-key fetch
+    if chunks:
+        assign_chunk_ids(chunks, db)
+        link_chunk_neighbors(chunks)
 
-    # Insert chunks and embeddings in batches to avoid partial writes
+    # Insert chunks in batches to avoid partial writes
     for i in range(0, len(chunks), CHUNK_BATCH_SIZE):
         batch = chunks[i : i + CHUNK_BATCH_SIZE]
 
-        # Generate embeddings concurrently for this batch
-        await asyncio.gather(*(embed_chunk(chunk) for chunk in batch))
-
         # Commit batch to database
         db.add_all(batch)
         try:
@@ -80,94 +364,180 @@ async def process_document(document_id: int, db: Session) -> int:
             logger.exception("Failed to commit chunk batch starting at %s: %s", i, e)
             raise
 
-    return len(chunks)
+    return len(chunks), next_state
 
 
-def extract_document_sections(doc) -> List[Dict]:
-    """Extract sections and their headers from the document"""
+def split_parse_windows(text: str, max_chars: int = PARSE_WINDOW_CHARS) -> List[str]:
+    """Split ``text`` at paragraph breaks into windows of at most ``max_chars``.
+
+    Each window keeps the blank lines that end it, so the windows concatenate
+    back to ``text`` exactly. A single paragraph longer than ``max_chars`` is
+    kept whole rather than cut mid-sentence.
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    windows = []
+    start = cut = 0
+    for end in [match.end() for match in _PARAGRAPH_BREAK.finditer(text)] + [len(text)]:
+        if end - start > max_chars and cut > start:
+            windows.append(text[start:cut])
+            start = cut
+        cut = end
+    if start < len(text):
+        windows.append(text[start:])
+    return windows
+
+
+def parse_document(text: str) -> "Doc":
+    """Parse ``text`` with spaCy, in windows when it is large.
+
+    Texts longer than ``PARSE_WINDOW_CHARS`` are split at paragraph breaks and
+    the windows are parsed one after another with ``nlp.pipe``, so no single
+    parse holds the whole document (or exceeds spaCy's ``max_length``). The
+    window docs are stitched back into one ``Doc`` whose text, sentence and
+    entity offsets match the original text.
+
+    Parsing stays in the calling thread or process: parallelism across cores
+    comes from the shared ingestion process pool (see ``chunk_text_in_pool``),
+    never from processes started per document.
+    """
+    from spacy.tokens import Doc
+
+    nlp = get_nlp()
+    windows = split_parse_windows(text)
+    if len(windows) == 1:
+        return nlp(text)
+
+    logger.info("Parsing %s characters in %s windows", len(text), len(windows))
+    # The windows concatenate back to the text, so no whitespace is added between them
+    return Doc.from_docs(list(nlp.pipe(windows)), ensure_whitespace=False)
+
+
+# Pattern for common section headers (e.g., "1. Introduction", "Chapter 1:", etc.)
+SECTION_HEADER_PATTERN = re.compile(r'^(?:\d+\.\s+|\w+\s+\d+:|Chapter\s+\d+:|Section\s+\d+:)\s*(.*)', re.IGNORECASE)
+
+# Entity labels that define semantic groups
+SEMANTIC_ENTITY_LABELS = {'ORG', 'PERSON', 'GPE', 'LOC', 'PRODUCT', 'EVENT', 'WORK_OF_ART'}
+
+
+def _section_header_text(sent_text: str) -> Optional[str]:
+    """Return the header title if the sentence looks like a section header"""
+    # Check for header patterns
+    header_match = SECTION_HEADER_PATTERN.match(sent_text)
+    if header_match:
+        return header_match.group(1)
+    # Check for short, capitalized sentences that might be headers
+    if len(sent_text) < 100 and sent_text.isupper():
+        return sent_text
+    # Check for sentences ending with a colon (potential headers)
+    if sent_text.endswith(':') and len(sent_text) < 100:
+        return sent_text.rstrip(':')
+    return None
+
+
+def extract_document_structure(doc) -> Tuple[List[Dict], List[Dict], Dict[int, str]]:
+    """Extract sections, paragraphs and semantic groups in a single pass.
+
+    The sentence spans are materialized once. Entities and noun chunks are
+    mapped to their sentences by binary search over the sentence offsets, so
+    the whole extraction is linear in the document size (up to a log factor).
+
+    Returns ``(sections, paragraphs, semantic_groups)``:
+    - sections: ``{'title', 'content', 'start_idx', 'end_idx'}`` per section
+    - paragraphs: ``{'id', 'content', 'start_idx', 'end_idx'}`` per paragraph
+    - semantic_groups: topic/entity group per sentence index
+    """
+    return extract_segment_structure(doc)[:3]
+
+
+def extract_segment_structure(doc, state: StructureState = StructureState()
+                              ) -> Tuple[List[Dict], List[Dict], Dict[int, str], StructureState]:
+    """Extract the structure of one text segment of a document.
+
+    As ``extract_document_structure``, but paragraph ids start at
+    ``state.paragraph_start`` and the sentences before the segment's first
+    header belong to ``state.open_section``. If that section already had
+    sentences it is marked ``'continued'``, since it started in an earlier
+    segment.
+
+    Returns ``(sections, paragraphs, semantic_groups, next_state)``.
+    """
+    sents = list(doc.sents)
+    sent_count = len(sents)
+    sent_start_chars = [sent.start_char for sent in sents]
+    sent_start_tokens = [sent.start for sent in sents]
+
+    # Main entities in order of first appearance; each sentence takes the first
+    # of them (in that order) that starts inside it
+    entity_names = {}
+    sentence_entity = {}
+    for ent in doc.ents:
+        if ent.label_ not in SEMANTIC_ENTITY_LABELS:
+            continue
+        rank = entity_names.setdefault(ent.text, len(entity_names))
+        i = bisect_right(sent_start_chars, ent.start_char) - 1
+        if i >= 0 and ent.start_char < sents[i].end_char and rank < sentence_entity.get(i, len(entity_names)):
+            sentence_entity[i] = rank
+    entity_by_rank = list(entity_names)
+
+    # First noun chunk of each sentence, only computed if some sentence needs it
+    first_noun_chunk = None
+
+    def noun_chunk_for(i: int) -> Optional[str]:
+        nonlocal first_noun_chunk
+        if first_noun_chunk is None:
+            first_noun_chunk = {}
+            for chunk in doc.noun_chunks:
+                j = bisect_right(sent_start_tokens, chunk.start) - 1
+                if j >= 0 and chunk.end <= sents[j].end and j not in first_noun_chunk:
+                    first_noun_chunk[j] = chunk.text
+        return first_noun_chunk.get(i)
+
     sections = []
-    current_section = None
+    current_section = state.open_section
     current_section_text = []
-    
-    # Pattern for common section headers (e.g., "1. Introduction", "Chapter 1:", etc.)
-    header_pattern = re.compile(r'^(?:\d+\.\s+|\w+\s+\d+:|Chapter\s+\d+:|Section\s+\d+:)\s*(.*)', re.IGNORECASE)
-    
-    for i, sent in enumerate(doc.sents):
+    continued = current_section is not None and state.section_started  # Started in an earlier segment
+
+    def add_section(title: str, start_idx: int, end_idx: int):
+        section = {
+            'title': title,
+            'content': ' '.join(current_section_text),
+            'start_idx': start_idx,
+            'end_idx': end_idx
+        }
+        if continued:
+            section['continued'] = True
+        sections.append(section)
+
+    paragraphs = []
+    current_paragraph = []
+    paragraph_id = state.paragraph_start
+
+    semantic_groups = {}
+
+    for i, sent in enumerate(sents):
         sent_text = sent.text.strip()
-        
-        # Check if this sentence looks like a section header
-        is_header = False
-        header_match = header_pattern.match(sent_text)
-        
-        # Check for header patterns
-        if header_match:
-            is_header = True
-            header_text = header_match.group(1)
-        # Check for short, capitalized sentences that might be headers
-        elif len(sent_text) < 100 and sent_text.isupper():
-            is_header = True
-            header_text = sent_text
-        # Check for sentences ending with a colon (potential headers)
-        elif sent_text.endswith(':') and len(sent_text) < 100:
-            is_header = True
-            header_text = sent_text.rstrip(':')
-        
-        if is_header:
-            # Save previous section if it exists
-            if current_section is not None:
-                sections.append({
-                    'title': current_section,
-                    'content': ' '.join(current_section_text),
-                    'start_idx': i - len(current_section_text),
-                    'end_idx': i - 1
-                })
-            
+
+        # Sections: a header closes the previous section and starts a new one
+        header_text = _section_header_text(sent_text)
+        if header_text is not None:
+            # Save previous section if it exists (a continued one only if it has
+            # sentences in this segment)
+            if current_section is not None and (current_section_text or not continued):
+                add_section(current_section, i - len(current_section_text), i - 1)
+
             # Start new section
             current_section = header_text
             current_section_text = []
+            continued = False
         else:
             # Add to current section
             current_section_text.append(sent_text)
-    
-    # Add the last section
-    if current_section is not None and current_section_text:
-        sections.append({
-            'title': current_section,
-            'content': ' '.join(current_section_text),
-            'start_idx': len(list(doc.sents)) - len(current_section_text),
-            'end_idx': len(list(doc.sents)) - 1
-        })
-    elif current_section_text:  # Document has no sections but has content
-        sections.append({
-            'title': 'Main Content',
-            'content': ' '.join(current_section_text),
-            'start_idx': 0,
-            'end_idx': len(list(doc.sents)) - 1
-        })
-    
-    return sections
 
-
-def extract_paragraphs(doc) -> List[Dict]:
-    """Extract paragraphs from the document"""
-    paragraphs = []
-    current_paragraph = []
-    paragraph_id = 1
-    
-    for i, sent in enumerate(doc.sents):
-        sent_text = sent.text.strip()
+        # Paragraphs: break on the last sentence or a gap before the next one
         current_paragraph.append(sent_text)
-        
-        # Check for paragraph breaks (empty lines, etc.)
-        next_sent = None
-        if i < len(list(doc.sents)) - 1:
-            next_sent_idx = i + 1
-            for potential_next in doc.sents:
-                if list(doc.sents).index(potential_next) == next_sent_idx:
-                    next_sent = potential_next
-                    break
-        
-        # If this is the last sentence or there's a paragraph break
+        next_sent = sents[i + 1] if i + 1 < sent_count else None
         if next_sent is None or sent.end_char + 2 < next_sent.start_char:
             paragraphs.append({
                 'id': paragraph_id,
@@ -177,144 +547,140 @@ def extract_paragraphs(doc) -> List[Dict]:
             })
             paragraph_id += 1
             current_paragraph = []
-    
-    # Add the last paragraph if not already added
-    if current_paragraph:
-        paragraphs.append({
-            'id': paragraph_id,
-            'content': ' '.join(current_paragraph),
-            'start_idx': len(list(doc.sents)) - len(current_paragraph),
-            'end_idx': len(list(doc.sents)) - 1
-        })
-    
-    return paragraphs
+
+        # Semantic groups: the sentence's main entity, else its main noun phrase
+        if i in sentence_entity:
+            semantic_groups[i] = f"Topic: {entity_by_rank[sentence_entity[i]]}"
+        else:
+            main_noun = noun_chunk_for(i)
+            semantic_groups[i] = f"Topic: {main_noun}" if main_noun is not None else "General Content"
+
+    # Add the last section
+    if current_section is not None and current_section_text:
+        add_section(current_section, sent_count - len(current_section_text), sent_count - 1)
+    elif current_section_text:  # Document has no sections but has content
+        current_section = 'Main Content'
+        add_section(current_section, 0, sent_count - 1)
+
+    next_state = StructureState(paragraph_start=paragraph_id, open_section=current_section,
+                                section_started=continued or bool(current_section_text))
+    return sections, paragraphs, semantic_groups, next_state
+
+
+def extract_document_sections(doc) -> List[Dict]:
+    """Extract sections and their headers from the document"""
+    return extract_document_structure(doc)[0]
+
+
+def extract_paragraphs(doc) -> List[Dict]:
+    """Extract paragraphs from the document"""
+    return extract_document_structure(doc)[1]
 
 
 def identify_semantic_groups(doc) -> Dict[int, str]:
     """Identify semantic groups (topics/entities) for sentences"""
-    semantic_groups = {}
-    
-    # Extract main entities and noun chunks
-    main_entities = {}
-    for ent in doc.ents:
-        if ent.label_ in ['ORG', 'PERSON', 'GPE', 'LOC', 'PRODUCT', 'EVENT', 'WORK_OF_ART']:
-            if ent.text not in main_entities:
-                main_entities[ent.text] = []
-            main_entities[ent.text].append(ent.start_char)
-    
-    # Group sentences by their main entities/topics
-    for i, sent in enumerate(doc.sents):
-        assigned_group = None
-        
-        # Check if sentence contains any main entities
-        for entity, positions in main_entities.items():
-            if any(pos >= sent.start_char and pos < sent.end_char for pos in positions):
-                assigned_group = f"Topic: {entity}"
-                break
-        
-        # If no entity found, use the main noun phrase as the topic
-        if not assigned_group:
-            main_nouns = [chunk.text for chunk in sent.noun_chunks]
-            if main_nouns:
-                assigned_group = f"Topic: {main_nouns[0]}"
-            else:
-                assigned_group = "General Content"
-        
-        semantic_groups[i] = assigned_group
-    
-    return semantic_groups
-
-
-def create_semantic_chunks(doc, document_id: int, sections: List[Dict], 
-                         paragraphs: List[Dict], semantic_groups: Dict[int, str]) -> List[Chunk]:
-    """Create semantic chunks based on document structure and content"""
-    from app.models import Chunk
-    
-    chunks = []
-    sequence_number = 1
-    
+    return extract_document_structure(doc)[2]
+
+
+def _sentence_entity_counts(doc, sents) -> List[int]:
+    """Number of entities within each sentence (as ``len(sent.ents)``), from one pass over the entities"""
+    ents = doc.ents
+    ent_starts = [ent.start for ent in ents]
+    ent_ends = [ent.end for ent in ents]
+    counts = []
+    for sent in sents:
+        first = k = bisect_left(ent_starts, sent.start)
+        while k < len(ents) and ent_ends[k] <= sent.end:
+            k += 1
+        counts.append(k - first)
+    return counts
+
+
+def iter_chunk_records(doc, sections: List[Dict], paragraphs: List[Dict],
+                       semantic_groups: Dict[int, str], sequence_start: int = 1) -> Iterator[ChunkRecord]:
+    """Yield semantic chunk records based on document structure and content.
+
+    Chunks are assembled in a single pass over the sentences: header sentences
+    are looked up in a set, the size of the chunk being built is kept as a
+    running character count and entity counts are computed once per sentence.
+    Each chunk is yielded as soon as it is complete, so callers can start
+    embedding before the rest of the document is chunked.
+    """
+    sents = list(doc.sents)
+    entity_counts = _sentence_entity_counts(doc, sents)
+
     # Map sentence indices to their paragraph IDs
     sent_to_paragraph = {}
     for para in paragraphs:
         for i in range(para['start_idx'], para['end_idx'] + 1):
             sent_to_paragraph[i] = para['id']
-    
+
     # Map sentence indices to their section titles
     sent_to_section = {}
     for section in sections:
         for i in range(section['start_idx'], section['end_idx'] + 1):
             sent_to_section[i] = section['title']
-    
+
+    # A continued section's header was chunked with an earlier segment
+    header_indices = {section['start_idx'] for section in sections if not section.get('continued')}
+
+    sequence_number = sequence_start
+
     # Create chunks based on semantic coherence
     current_chunk_text = []
-    current_chunk_sentences = []
+    current_chunk_chars = 0  # len(' '.join(current_chunk_text))
+    current_chunk_entities = 0
     current_semantic_group = None
     current_paragraph_id = None
     current_section_title = None
-    
-    for i, sent in enumerate(doc.sents):
+
+    def content_chunk() -> ChunkRecord:
+        # Calculate importance score based on entity density and sentence position
+        avg_entity_density = current_chunk_entities / len(current_chunk_text)
+        importance_score = min(1.0, avg_entity_density * 0.5 + 0.5 * (1 if current_section_title else 0))
+        return ChunkRecord(
+            sequence_number=sequence_number,
+            content=' '.join(current_chunk_text),
+            section_title=current_section_title,
+            is_section_header=False,  # This is for content chunks
+            paragraph_id=current_paragraph_id,
+            semantic_group=current_semantic_group,
+            importance_score=importance_score
+        )
+
+    for i, sent in enumerate(sents):
         sent_text = sent.text.strip()
         if not sent_text:  # Skip empty sentences
             continue
-            
+
         # Get metadata for this sentence
         paragraph_id = sent_to_paragraph.get(i)
         section_title = sent_to_section.get(i)
         semantic_group = semantic_groups.get(i)
-        
-        # Check if this is a section header
-        is_section_header = False
-        for section in sections:
-            if section['start_idx'] == i and i == section['start_idx']:
-                is_section_header = True
-                break
-        
-        # Determine if we should start a new chunk
-        start_new_chunk = False
-        
-        # Start new chunk if this is a section header
-        if is_section_header:
-            start_new_chunk = True
-        # Start new chunk if semantic group changes
-        elif semantic_group != current_semantic_group and current_chunk_text:
-            start_new_chunk = True
-        # Start new chunk if paragraph changes
-        elif paragraph_id != current_paragraph_id and current_chunk_text:
-            start_new_chunk = True
-        # Start new chunk if current chunk is getting too large
-        elif len(' '.join(current_chunk_text)) + len(sent_text) > MAX_CHUNK_SIZE and current_chunk_text:
-            start_new_chunk = True
-        
+        is_section_header = i in header_indices
+
+        # Determine if we should start a new chunk: at a section header, or when
+        # the semantic group or paragraph changes, or the chunk would grow too large
+        start_new_chunk = current_chunk_text and (
+            is_section_header
+            or semantic_group != current_semantic_group
+            or paragraph_id != current_paragraph_id
+            or current_chunk_chars + len(sent_text) > MAX_CHUNK_SIZE
+        )
+
         # Create a chunk from accumulated sentences if needed
-        if start_new_chunk and current_chunk_text:
-            chunk_text = ' '.join(current_chunk_text)
-            
-            # Calculate importance score based on entity density and sentence position
-            entity_count = sum(1 for sent in current_chunk_sentences for ent in sent.ents)
-            avg_entity_density = entity_count / len(current_chunk_sentences) if current_chunk_sentences else 0
-            importance_score = min(1.0, avg_entity_density * 0.5 + 0.5 * (1 if current_section_title else 0))
-            
-            chunk = Chunk(
-                document_id=document_id,
-                sequence_number=sequence_number,
-                content=chunk_text,
-                section_title=current_section_title,
-                is_section_header=False,  # This is for content chunks
-                paragraph_id=current_paragraph_id,
-                semantic_group=current_semantic_group,
-                importance_score=importance_score
-            )
-            chunks.append(chunk)
+        if start_new_chunk:
+            yield content_chunk()
             sequence_number += 1
-            
+
             # Reset for next chunk
             current_chunk_text = []
-            current_chunk_sentences = []
-        
+            current_chunk_chars = 0
+            current_chunk_entities = 0
+
         # If this is a section header, create a special chunk for it
         if is_section_header:
-            chunk = Chunk(
-                document_id=document_id,
+            yield ChunkRecord(
                 sequence_number=sequence_number,
                 content=sent_text,
                 section_title=sent_text,
@@ -323,42 +689,31 @@ def create_semantic_chunks(doc, document_id: int, sections: List[Dict],
                 semantic_group="Section Header",
                 importance_score=1.0  # Headers are maximally important
             )
-            chunks.append(chunk)
             sequence_number += 1
-            
-            # Update tracking variables
-            current_chunk_text = []
-            current_chunk_sentences = []
-            current_semantic_group = semantic_group
-            current_paragraph_id = paragraph_id
-            current_section_title = section_title
         else:
             # Add to current chunk
+            current_chunk_chars += len(sent_text) + (1 if current_chunk_text else 0)
             current_chunk_text.append(sent_text)
-            current_chunk_sentences.append(sent)
-            current_semantic_group = semantic_group
-            current_paragraph_id = paragraph_id
-            current_section_title = section_title
-    
+            current_chunk_entities += entity_counts[i]
+
+        # Update tracking variables
+        current_semantic_group = semantic_group
+        current_paragraph_id = paragraph_id
+        current_section_title = section_title
+
     # Add the last chunk if there's anything left
     if current_chunk_text:
-        chunk_text = ' '.join(current_chunk_text)
-        
-        # Calculate importance score
-        entity_count = sum(1 for sent in current_chunk_sentences for ent in sent.ents)
-        avg_entity_density = entity_count / len(current_chunk_sentences) if current_chunk_sentences else 0
-        importance_score = min(1.0, avg_entity_density * 0.5 + 0.5 * (1 if current_section_title else 0))
-        
-        chunk = Chunk(
-            document_id=document_id,
-            sequence_number=sequence_number,
-            content=chunk_text,
-            section_title=current_section_title,
-            is_section_header=False,
-            paragraph_id=current_paragraph_id,
-            semantic_group=current_semantic_group,
-            importance_score=importance_score
-        )
-        chunks.append(chunk)
-    
-    return chunks
+        yield content_chunk()
+
+
+def iter_semantic_chunks(doc, document_id: int, sections: List[Dict], paragraphs: List[Dict],
+                         semantic_groups: Dict[int, str], sequence_start: int = 1) -> Iterator[Chunk]:
+    """Yield ``Chunk`` rows for the chunk records of a document as they are produced"""
+    for record in iter_chunk_records(doc, sections, paragraphs, semantic_groups, sequence_start):
+        yield Chunk(document_id=document_id, **record._asdict())
+
+
+def create_semantic_chunks(doc, document_id: int, sections: List[Dict],
+                           paragraphs: List[Dict], semantic_groups: Dict[int, str]) -> List[Chunk]:
+    """Create semantic chunks based on document structure and content"""
+    return list(iter_semantic_chunks(doc, document_id, sections, paragraphs, semantic_groups))
@@ -0,0 +1,106 @@
+import codecs
+import logging
+import os
+import re
+import tempfile
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Upload spooling configuration
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "roundtable-uploads"))  # Must be shared with ingestion workers
+UPLOAD_BLOCK_SIZE = 1024 * 1024  # Bytes (or characters) read at a time from uploads
+
+# Size of the text segments large documents are chunked in
+SOURCE_SEGMENT_CHARS = int(os.getenv("SOURCE_SEGMENT_CHARS", "200000"))
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def remove_source(path: str):
+    """Delete a spooled upload, ignoring files that are already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Could not remove spooled upload %s: %s", path, e)
+
+
+def iter_pdf_pages(path: str) -> Iterator[str]:
+    """Yield the text of each page of a PDF, extracting one page at a time"""
+    from PyPDF2 import PdfReader
+
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
+
+def read_pdf_text(path: str) -> str:
+    """Extract the whole text of a (small) PDF, with pages separated by newlines"""
+    return "\n".join(iter_pdf_pages(path)).strip()
+
+
+def count_pdf_pages(path: str) -> int:
+    """Open a PDF and return its page count without extracting any text"""
+    from PyPDF2 import PdfReader
+
+    with open(path, "rb") as f:
+        return len(PdfReader(f).pages)
+
+
+def iter_text_blocks(path: str) -> Iterator[str]:
+    """Yield a UTF-8 text file as decoded blocks of at most ``UPLOAD_BLOCK_SIZE`` characters"""
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+
+def validate_text_file(path: str):
+    """Raise ``UnicodeDecodeError`` unless the file is valid UTF-8, reading it block by block"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(UPLOAD_BLOCK_SIZE)
+            decoder.decode(block, final=not block)
+            if not block:
+                break
+
+
+def iter_source_pieces(path: str) -> Iterator[str]:
+    """Yield the text of a spooled upload piece by piece (PDF pages or text blocks)"""
+    if path.lower().endswith(".pdf"):
+        # Pages are separated like paragraphs so segments can end at a page
+        return (page + "\n\n" for page in iter_pdf_pages(path))
+    return iter_text_blocks(path)
+
+
+def iter_segments(pieces: Iterable[str], max_chars: int = SOURCE_SEGMENT_CHARS) -> Iterator[str]:
+    """Regroup streamed text into segments of about ``max_chars`` characters.
+
+    Segments end at the last paragraph break (or page) before the limit, so
+    only about one segment of text is held at a time. Text with no paragraph
+    break within ``max_chars`` is cut at the limit.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        while len(buffer) >= max_chars:
+            cut = 0
+            for match in _PARAGRAPH_BREAK.finditer(buffer, 0, max_chars):
+                cut = match.end()
+            if cut == 0:
+                cut = max_chars
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    if buffer.strip():
+        yield buffer
+
+
+def iter_source_segments(path: str) -> Iterator[str]:
+    """Yield the text of a spooled upload in segments, extracting it incrementally"""
+    return iter_segments(iter_source_pieces(path))
@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Type
+
+import numpy as np
+
+# API keys and configuration
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Embedding configuration
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_DIMENSION = 1536  # Dimension of OpenAI's text-embedding-ada-002 (and of Chunk.embedding)
+
+# Backend selection; defaults to OpenAI when a key is configured and to the
+# deterministic hash vectors otherwise
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND") or ("openai" if OPENAI_API_KEY else "hash")
+
+# OpenAI batch configuration
+EMBED_MAX_BATCH_INPUTS = 2048     # Maximum number of inputs per provider request
+EMBED_MAX_BATCH_TOKENS = 100_000  # Approximate token budget per provider request
+EMBED_MAX_CONCURRENT_REQUESTS = 4  # Number of provider requests in flight at once
+
+# Local backend configuration
+LOCAL_EMBEDDING_IDF_PATH = os.getenv("LOCAL_EMBEDDING_IDF_PATH")  # Optional .npy produced by compute_idf
+LOCAL_HASH_BUCKETS = 2 ** 20  # Size of the hashed feature space the IDF weights are indexed by
+LOCAL_PROJECTIONS_PER_FEATURE = 4  # Non-zeros per feature in the sparse random projection
+
+# Fixed unit vector the local backend assigns to texts without any features
+EMPTY_TEXT_VECTOR = np.full(EMBEDDING_DIMENSION, 1 / np.sqrt(EMBEDDING_DIMENSION), dtype=np.float32)
+
+
+class EmbeddingBackend(ABC):
+    """Interface for embedding backends.
+
+    Backends embed a batch of texts into ``EMBEDDING_DIMENSION``-sized vectors,
+    returned in input order. ``model_name`` identifies the vector space and is
+    used as the embedding cache key, so two backends must never share one.
+    ``cacheable`` is False for backends that are cheaper to recompute than to
+    look up.
+    """
+
+    name: str = ""
+    model_name: str = ""
+    cacheable: bool = True
+
+    @abstractmethod
+    def embed_sync(self, texts: List[str]) -> List[List[float]]:
+        """Embed ``texts`` in the calling thread"""
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed ``texts`` without blocking the event loop"""
+
+
+_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {}
+_instances: Dict[str, EmbeddingBackend] = {}
+
+
+def register_backend(name: str):
+    """Class decorator registering an ``EmbeddingBackend`` under ``name``"""
+    def decorator(cls: Type[EmbeddingBackend]) -> Type[EmbeddingBackend]:
+        cls.name = name
+        _BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def get_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """Return the (shared) backend instance for ``name``, or the configured one"""
+    name = name or EMBEDDING_BACKEND
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Available: {', '.join(sorted(_BACKENDS))}")
+    if name not in _instances:
+        _instances[name] = _BACKENDS[name]()
+    return _instances[name]
+
+
+def available_backends() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for request packing"""
+    return len(text) // 4 + 1
+
+
+def _pack_batches(texts: Sequence[str]) -> List[List[int]]:
+    """Split ``texts`` into batches of indices bounded by input count and token size.
+
+    A single input larger than the token budget still gets a batch of its own;
+    the provider is left to reject it just as it would for a single request.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for i, text in enumerate(texts):
+        tokens = _estimate_tokens(text)
+        if current and (
+            len(current) >= EMBED_MAX_BATCH_INPUTS
+            or current_tokens + tokens > EMBED_MAX_BATCH_TOKENS
+        ):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+@register_backend("openai")
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI embeddings API, packing many inputs into each request"""
+
+    model_name = EMBEDDING_MODEL
+
+    def __init__(self):
+        if not OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY environment variable not set")
+        # Imported on first use; the client library is slow to import
+        import openai
+        openai.api_key = OPENAI_API_KEY
+        self.client = openai
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        embeddings: List[List[float]] = [None] * len(texts)
+        semaphore = asyncio.Semaphore(EMBED_MAX_CONCURRENT_REQUESTS)
+
+        async def embed_batch(batch: List[int]):
+            async with semaphore:
+                response = await self.client.Embedding.acreate(
+                    input=[texts[i] for i in batch],
+                    model=self.model_name
+                )
+            # The provider reports the position of each input within the request
+            for item in response["data"]:
+                embeddings[batch[item["index"]]] = item["embedding"]
+
+        await asyncio.gather(*(embed_batch(batch) for batch in _pack_batches(texts)))
+
+        return embeddings
+
+    def embed_sync(self, texts: List[str]) -> List[List[float]]:
+        embeddings: List[List[float]] = [None] * len(texts)
+        for batch in _pack_batches(texts):
+            response = self.client.Embedding.create(
+                input=[texts[i] for i in batch],
+                model=self.model_name
+            )
+            for item in response["data"]:
+                embeddings[batch[item["index"]]] = item["embedding"]
+        return embeddings
+
+
+@register_backend("hash")
+class HashEmbeddingBackend(EmbeddingBackend):
+    """Deterministic embedding using a hash of the text.
+
+    The resulting vector is repeatable for the same input but carries no
+    semantic meaning. Intended only for local development and testing.
+    """
+
+    model_name = "sha256-random"
+    cacheable = False
+
+    def embed_sync(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_sync(texts)
+
+    @staticmethod
+    def _embed_one(text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        seed = int.from_bytes(digest[:8], "little")
+        rng = np.random.default_rng(seed)
+        return rng.uniform(-1, 1, EMBEDDING_DIMENSION).tolist()
+
+
+_WORD_PATTERN = re.compile(r"\w+")
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _text_features(text: str) -> Counter:
+    """Word unigrams, word bigrams and character trigrams of ``text``"""
+    words = _WORD_PATTERN.findall(text.lower())
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"<{word}>"
+        features.update(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+@lru_cache(maxsize=2 ** 18)
+def _feature_hash(feature: str) -> int:
+    """Stable 64-bit feature hash (Python's ``hash`` is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _splitmix64(values: np.ndarray) -> np.ndarray:
+    """Vectorized SplitMix64 finalizer used to derive projection positions"""
+    with np.errstate(over="ignore"):
+        z = values + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return (z ^ (z >> np.uint64(31))) & _MASK64
+
+
+def compute_idf(texts: Sequence[str]) -> np.ndarray:
+    """Compute smoothed IDF weights over the hashed feature space of ``texts``.
+
+    Save the result with ``np.save`` and point ``LOCAL_EMBEDDING_IDF_PATH`` at it
+    to weight the local backend's features by a representative corpus.
+    """
+    document_frequency = np.zeros(LOCAL_HASH_BUCKETS, dtype=np.float64)
+    for text in texts:
+        buckets = {_feature_hash(feature) % LOCAL_HASH_BUCKETS for feature in _text_features(text)}
+        document_frequency[list(buckets)] += 1
+    return (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+
+@register_backend("local")
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """Offline CPU backend: hashed n-gram TF-IDF with a sparse random projection.
+
+    Each text is turned into sublinear TF counts of word unigrams, bigrams and
+    character trigrams, weighted by IDF (uniform unless ``LOCAL_EMBEDDING_IDF_PATH``
+    is set). Every feature hash is projected onto ``LOCAL_PROJECTIONS_PER_FEATURE``
+    signed positions of an ``EMBEDDING_DIMENSION`` vector, which is a sparse
+    Johnson-Lindenstrauss projection of the hashed TF-IDF vector. Texts sharing
+    vocabulary therefore get nearby vectors, with no network access and
+    millisecond latency per batch.
+    """
+
+    model_name = f"local-tfidf-{EMBEDDING_DIMENSION}"
+    cacheable = False
+
+    def __init__(self, idf_path: Optional[str] = LOCAL_EMBEDDING_IDF_PATH):
+        self.idf = np.load(idf_path, mmap_mode="r") if idf_path else None
+
+    def embed_sync(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_matrix(texts).tolist()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        # CPU-bound, so run in a worker thread
+        return await asyncio.to_thread(self.embed_sync, texts)
+
+    def embed_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed ``texts`` into an L2-normalized float32 matrix.
+
+        Texts without any features (empty or punctuation only) get
+        ``EMPTY_TEXT_VECTOR`` rather than a zero vector, whose cosine distance
+        to anything is undefined.
+        """
+        rows, hashes, counts = [], [], []
+        for row, text in enumerate(texts):
+            for feature, count in _text_features(text).items():
+                rows.append(row)
+                hashes.append(_feature_hash(feature))
+                counts.append(count)
+
+        matrix = np.zeros((len(texts), EMBEDDING_DIMENSION), dtype=np.float32)
+        if not rows:
+            matrix[:] = EMPTY_TEXT_VECTOR
+            return matrix
+
+        rows = np.asarray(rows, dtype=np.int64)
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        weights = 1.0 + np.log(np.asarray(counts, dtype=np.float64))
+        if self.idf is not None:
+            weights *= self.idf[(hashes % np.uint64(LOCAL_HASH_BUCKETS)).astype(np.int64)]
+        weights /= np.sqrt(LOCAL_PROJECTIONS_PER_FEATURE)
+
+        flat = np.zeros(len(texts) * EMBEDDING_DIMENSION, dtype=np.float64)
+        for j in range(LOCAL_PROJECTIONS_PER_FEATURE):
+            mixed = _splitmix64(hashes + np.uint64(j))
+            columns = (mixed % np.uint64(EMBEDDING_DIMENSION)).astype(np.int64)
+            signs = np.where(mixed >> np.uint64(63), -1.0, 1.0)
+            flat += np.bincount(rows * EMBEDDING_DIMENSION + columns, weights=weights * signs,
+                                minlength=flat.size)
+
+        matrix[:] = flat.reshape(len(texts), EMBEDDING_DIMENSION)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        matrix[norms[:, 0] == 0] = EMPTY_TEXT_VECTOR
+        return matrix
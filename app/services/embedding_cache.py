@@ -0,0 +1,212 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db import SessionLocal
+from app.models import EmbeddingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "true").lower() == "true"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))  # In-memory LRU size
+EMBEDDING_CACHE_MAX_AGE_SECONDS = int(os.getenv("EMBEDDING_CACHE_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "1000000"))  # Postgres tier size
+EMBEDDING_CACHE_PRUNE_INTERVAL = 1000  # Prune the Postgres tier after this many writes
+
+# Keep IN lists for the Postgres lookups to a reasonable size
+DB_LOOKUP_BATCH_SIZE = 500
+
+
+def text_hash(text: str) -> str:
+    """Content address for ``text``"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by (embedding model, sha256 of the text).
+
+    The first tier is a bounded in-process LRU. Misses fall through to the
+    ``embedding_cache`` Postgres table, and hits from there are promoted into
+    memory. Entries older than ``max_age_seconds`` are treated as misses in both
+    tiers, and the Postgres tier is periodically trimmed by age and row count.
+    Database errors are logged and treated as misses so the cache can never
+    break embedding generation.
+    """
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 max_age_seconds: int = EMBEDDING_CACHE_MAX_AGE_SECONDS,
+                 max_rows: int = EMBEDDING_CACHE_MAX_ROWS,
+                 persist: bool = EMBEDDING_CACHE_PERSIST):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.max_rows = max_rows
+        self.persist = persist
+
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (created_at, embedding)
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._counters = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "db_errors": 0,
+        }
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+        """Return cached embeddings for whichever of ``texts`` are present"""
+        found = {}
+        missing = {}
+        now = time.time()
+
+        with self._lock:
+            for text in texts:
+                key = (model, text_hash(text))
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] > self.max_age_seconds:
+                    del self._entries[key]
+                    self._counters["evictions"] += 1
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    found[text] = entry[1]
+                    self._counters["memory_hits"] += 1
+                else:
+                    missing[key[1]] = text
+
+        if missing and self.persist:
+            for hash_value, (created_at, embedding) in self._load_persistent(model, list(missing)).items():
+                text = missing.pop(hash_value)
+                found[text] = embedding
+                # Keep the row's age so promotion does not extend its lifetime
+                self._remember(model, hash_value, embedding, created_at)
+                self._count("db_hits")
+
+        self._count("misses", len(missing))
+        return found
+
+    def put_many(self, model: str, embeddings: Dict[str, List[float]]):
+        """Store freshly generated embeddings in both tiers"""
+        if not embeddings:
+            return
+
+        rows = []
+        for text, embedding in embeddings.items():
+            hash_value = text_hash(text)
+            self._remember(model, hash_value, embedding)
+            rows.append({"model": model, "text_hash": hash_value, "embedding": embedding})
+
+        if self.persist:
+            self._store_persistent(rows)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current in-memory size"""
+        with self._lock:
+            return dict(self._counters, memory_entries=len(self._entries))
+
+    def clear(self):
+        """Drop the in-memory tier (the Postgres tier is left untouched)"""
+        with self._lock:
+            self._entries.clear()
+
+    def prune(self) -> int:
+        """Evict Postgres rows older than the max age or beyond the max row count.
+
+        Returns the number of rows deleted.
+        """
+        db = SessionLocal()
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.max_age_seconds)
+            deleted = db.query(EmbeddingCacheEntry).filter(
+                EmbeddingCacheEntry.created_at < cutoff
+            ).delete(synchronize_session=False)
+
+            # Only consider the size bound once the table has outgrown it
+            overflow = db.query(EmbeddingCacheEntry).count() - self.max_rows
+            if overflow > 0:
+                oldest = select(
+                    EmbeddingCacheEntry.model, EmbeddingCacheEntry.text_hash
+                ).order_by(EmbeddingCacheEntry.created_at).limit(overflow)
+                deleted += db.query(EmbeddingCacheEntry).filter(
+                    tuple_(EmbeddingCacheEntry.model, EmbeddingCacheEntry.text_hash).in_(oldest)
+                ).delete(synchronize_session=False)
+
+            db.commit()
+            self._count("evictions", deleted)
+            return deleted
+        except SQLAlchemyError as e:
+            db.rollback()
+            self._count("db_errors")
+            logger.warning("Failed to prune embedding cache: %s", e)
+            return 0
+        finally:
+            db.close()
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _remember(self, model: str, hash_value: str, embedding: List[float], created_at: Optional[float] = None):
+        with self._lock:
+            key = (model, hash_value)
+            self._entries[key] = (time.time() if created_at is None else created_at, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _load_persistent(self, model: str, hashes: List[str]) -> Dict[str, Tuple[float, List[float]]]:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.max_age_seconds)
+        loaded = {}
+        db = SessionLocal()
+        try:
+            for i in range(0, len(hashes), DB_LOOKUP_BATCH_SIZE):
+                rows = db.query(
+                    EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding, EmbeddingCacheEntry.created_at
+                ).filter(
+                    EmbeddingCacheEntry.model == model,
+                    EmbeddingCacheEntry.text_hash.in_(hashes[i : i + DB_LOOKUP_BATCH_SIZE]),
+                    EmbeddingCacheEntry.created_at >= cutoff
+                ).all()
+                for hash_value, embedding, created_at in rows:
+                    loaded[hash_value] = (created_at.timestamp(), np.asarray(embedding, dtype=float).tolist())
+        except SQLAlchemyError as e:
+            self._count("db_errors")
+            logger.warning("Embedding cache lookup failed: %s", e)
+        finally:
+            db.close()
+        return loaded
+
+    def _store_persistent(self, rows: List[Dict]):
+        db = SessionLocal()
+        try:
+            db.execute(insert(EmbeddingCacheEntry).values(rows).on_conflict_do_nothing())
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            self._count("db_errors")
+            logger.warning("Embedding cache write failed: %s", e)
+            return
+        finally:
+            db.close()
+
+        self._writes_since_prune += len(rows)
+        if self._writes_since_prune >= EMBEDDING_CACHE_PRUNE_INTERVAL:
+            self._writes_since_prune = 0
+            self.prune()
+
+
+# Process-wide cache used by embedding_service
+embedding_cache: Optional[EmbeddingCache] = EmbeddingCache() if EMBEDDING_CACHE_ENABLED else None
@@ -1,72 +1,53 @@
-import hashlib
-import openai
-import os
-import numpy as np
-from typing import List
+import asyncio
+from typing import List, Sequence
 
-# API keys and configuration
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+from app.services.embedding_backends import (
+    EMBEDDING_DIMENSION,
+    EMBEDDING_MODEL,
+    get_backend,
+)
+from app.services.embedding_cache import embedding_cache
 
-# Embedding configuration
-EMBEDDING_MODEL = "text-embedding-ada-002"
-EMBEDDING_DIMENSION = 1536  # Dimension of OpenAI's text-embedding-ada-002
 
-def _deterministic_embedding(text: str) -> List[float]:
-    """Generate a deterministic embedding using a hash of the text.
+async def generate_embeddings(texts: Sequence[str]) -> List[List[float]]:
+    """Generate embeddings for many texts with the configured embedding backend.
 
-    This is used in development when ``OPENAI_API_KEY`` is not set. The
-    resulting vector is repeatable for the same input but carries no semantic
-    meaning.
+    Duplicate texts are embedded once, and texts already present in the
+    embedding cache skip the backend entirely. The remaining inputs are handed
+    to the backend as a single batch; the OpenAI backend packs them into
+    multi-input requests. Results are returned in the same order as ``texts``.
+
+    The backend is selected with ``EMBEDDING_BACKEND`` (see
+    ``embedding_backends``) and defaults to OpenAI when ``OPENAI_API_KEY`` is
+    set and to deterministic hash-based vectors otherwise.
     """
-    digest = hashlib.sha256(text.encode("utf-8")).digest()
-    seed = int.from_bytes(digest[:8], "little")
-    rng = np.random.default_rng(seed)
-    return rng.uniform(-1, 1, EMBEDDING_DIMENSION).tolist()
+    if not texts:
+        return []
 
+    backend = get_backend()
+    use_cache = embedding_cache is not None and backend.cacheable
+    unique_texts = list(dict.fromkeys(texts))
 
-async def generate_embedding(text: str) -> List[float]:
-    """Generate embedding for text using OpenAI API.
+    embeddings = {}
+    if use_cache:
+        embeddings = await asyncio.to_thread(embedding_cache.get_many, backend.model_name, unique_texts)
 
-    Falls back to a deterministic hash-based vector when ``OPENAI_API_KEY``
-    is not provided. This fallback is intended only for local development
-    and testing.
-    """
-    if not OPENAI_API_KEY:
-        return _deterministic_embedding(text)
-    
-    # Set OpenAI API key
-    openai.api_key = OPENAI_API_KEY
-    
-    # Generate embedding
-    response = await openai.Embedding.acreate(
-        input=text,
-        model=EMBEDDING_MODEL
-    )
-    
-    # Extract embedding
-    embedding = response["data"][0]["embedding"]
-    
-    return embedding
+    missing = [text for text in unique_texts if text not in embeddings]
+    if missing:
+        fresh = dict(zip(missing, await backend.embed(missing)))
+        embeddings.update(fresh)
+        if use_cache:
+            await asyncio.to_thread(embedding_cache.put_many, backend.model_name, fresh)
 
-def generate_embedding_sync(text: str) -> List[float]:
-    """Synchronous version of ``generate_embedding`` for internal use.
+    return [embeddings[text] for text in texts]
 
-    Mirrors the asynchronous function's behavior, including the deterministic
-    fallback when ``OPENAI_API_KEY`` is unset.
+
+async def generate_embedding(text: str) -> List[float]:
+    """Generate embedding for text using the configured embedding backend.
+
+    Falls back to a deterministic hash-based vector when ``OPENAI_API_KEY``
+    is not provided and no backend is configured. This fallback is intended
+    only for local development and testing.
     """
-    if not OPENAI_API_KEY:
-        return _deterministic_embedding(text)
-    
-    # Set OpenAI API key
-    openai.api_key = OPENAI_API_KEY
-    
-    # Generate embedding
-    response = openai.Embedding.create(
-        input=text,
-        model=EMBEDDING_MODEL
-    )
-    
-    # Extract embedding
-    embedding = response["data"][0]["embedding"]
-    
-    return embedding
+    embeddings = await generate_embeddings([text])
+    return embeddings[0]
@@ -0,0 +1,89 @@
+import logging
+import os
+import re
+from typing import List, Sequence, Tuple
+
+from app.models import Conversation, ModelConfig, Turn
+from app.services.context_builder import count_tokens
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# History compaction configuration
+HISTORY_COMPACTION_ENABLED = os.getenv("HISTORY_COMPACTION_ENABLED", "false").lower() == "true"
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "6"))  # Most recent turns always sent in full
+HISTORY_SUMMARY_INTERVAL = int(os.getenv("HISTORY_SUMMARY_INTERVAL", "4"))  # Fold older turns every K turns
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "400"))
+
+SUMMARY_PROMPT = """You maintain a running summary of a multi-agent discussion about documents.
+Update the summary with the new turns below. Keep each participant's main claims,
+points of disagreement and open questions. Write at most {max_tokens} tokens of plain prose."""
+
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def _extractive_summary(summary: str, turns: Sequence[Turn]) -> str:
+    """Offline fallback: append the first sentence of each turn, keeping the newest lines in budget"""
+    lines = summary.splitlines() if summary else []
+    for turn in turns:
+        first_sentence = _SENTENCE_PATTERN.split(turn.response.strip(), maxsplit=1)[0][:300]
+        lines.append(f"Turn {turn.turn_number}: {first_sentence}")
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > HISTORY_SUMMARY_MAX_TOKENS:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+async def summarize_turns(summary: str, turns: Sequence[Turn], model_config: ModelConfig) -> str:
+    """Fold ``turns`` into the running ``summary`` using the configured provider.
+
+    Only OpenAI models are called; other providers (whose chat calls are still
+    placeholders) and API errors fall back to an extractive summary.
+    """
+    if model_config is not None and model_config.provider.lower() == "openai" and OPENAI_API_KEY:
+        new_turns = "\n\n".join(f"Turn {turn.turn_number}: {turn.response}" for turn in turns)
+        try:
+            import openai
+
+            openai.api_key = OPENAI_API_KEY
+            response = await openai.ChatCompletion.acreate(
+                model=model_config.model_id,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT.format(max_tokens=HISTORY_SUMMARY_MAX_TOKENS)},
+                    {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{new_turns}"}
+                ],
+                max_tokens=HISTORY_SUMMARY_MAX_TOKENS,
+                temperature=0
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:  # noqa: BLE001
+            logger.warning("History summarization failed, using extractive summary: %s", e)
+
+    return _extractive_summary(summary, turns)
+
+
+async def compact_history(conversation: Conversation, previous_turns: List[Turn],
+                          model_config: ModelConfig, window: int = HISTORY_WINDOW,
+                          interval: int = HISTORY_SUMMARY_INTERVAL) -> Tuple[str, List[Turn]]:
+    """Split the history into a rolling summary and the recent turns.
+
+    Turns older than the last ``window`` are folded into
+    ``Conversation.history_summary``. The summary is extended incrementally,
+    and only once at least ``interval`` turns are waiting to be folded, so the
+    provider is called every ``interval`` turns; until then those turns are
+    still sent in full. The updated summary is left on the conversation for the
+    caller's commit.
+
+    Returns ``(summary, turns to send in full)``.
+    """
+    summarized_through = conversation.summarized_through_turn or 0
+    cutoff = len(previous_turns) - window
+    pending = [turn for turn in previous_turns[:max(cutoff, 0)] if turn.turn_number > summarized_through]
+
+    if len(pending) >= max(interval, 1):
+        conversation.history_summary = await summarize_turns(conversation.history_summary, pending, model_config)
+        conversation.summarized_through_turn = pending[-1].turn_number
+        summarized_through = conversation.summarized_through_turn
+
+    recent_turns = [turn for turn in previous_turns if turn.turn_number > summarized_through]
+    return conversation.history_summary or "", recent_turns
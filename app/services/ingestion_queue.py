@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal, engine
+from app.models import Chunk, Document, IngestionJob
+from app.services.ann_index import ensure_conversation_index
+from app.services.document_processor import process_document
+from app.services.memory_index import invalidate_conversation
+from app.services.retrieval_cache import bump_corpus_version
+
+logger = logging.getLogger(__name__)
+
+# Ingestion queue configuration
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))  # Worker tasks per API process (0: run scripts/ingestion_worker.py)
+INGESTION_POLL_INTERVAL = float(os.getenv("INGESTION_POLL_INTERVAL", "2.0"))  # Seconds between polls of an idle worker
+INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+INGESTION_JOB_TIMEOUT = int(os.getenv("INGESTION_JOB_TIMEOUT", "600"))  # Seconds a running job may go without a heartbeat
+INGESTION_HEARTBEAT_INTERVAL = INGESTION_JOB_TIMEOUT / 4  # Seconds between heartbeats of a running job
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+
+def enqueue_document(document: Document, db: Session) -> IngestionJob:
+    """Queue a document for chunking and embedding; the caller commits"""
+    job = IngestionJob(document=document, status="queued")
+    db.add(job)
+    return job
+
+
+def claim_next_job(db: Session) -> Optional[int]:
+    """Mark the oldest queued job as running and return its id, or None.
+
+    ``FOR UPDATE SKIP LOCKED`` lets any number of workers, in any number of
+    processes, poll the queue at once without claiming the same job or
+    waiting on each other's row locks.
+    """
+    job = db.execute(
+        sa.select(IngestionJob)
+        .where(IngestionJob.status == "queued")
+        .order_by(IngestionJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+    if job is None:
+        db.rollback()
+        return None
+
+    now = datetime.now(timezone.utc)
+    job.status = "running"
+    job.attempts += 1
+    job.started_at = now
+    job.heartbeat_at = now
+    job.chunks_embedded = 0
+    job.chunks_total = None
+    db.commit()
+    return job.id
+
+
+def requeue_stale_jobs(db: Session, timeout: int = INGESTION_JOB_TIMEOUT) -> int:
+    """Recover jobs whose worker stopped reporting progress (e.g. it crashed).
+
+    They are queued again, or failed once they have used up
+    ``INGESTION_MAX_ATTEMPTS``. Returns the number of jobs recovered.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=timeout)
+    stale = (IngestionJob.status == "running") & (IngestionJob.heartbeat_at < cutoff)
+    retried = db.execute(
+        sa.update(IngestionJob)
+        .where(stale, IngestionJob.attempts < INGESTION_MAX_ATTEMPTS)
+        .values(status="queued", error="Worker stopped responding")
+    ).rowcount
+    failed = db.execute(
+        sa.update(IngestionJob)
+        .where(stale, IngestionJob.attempts >= INGESTION_MAX_ATTEMPTS)
+        .values(status="failed", error="Worker stopped responding", finished_at=sa.func.now())
+    ).rowcount
+    db.commit()
+    if retried or failed:
+        logger.warning("Recovered %s stale ingestion jobs (%s requeued, %s failed)", retried + failed, retried, failed)
+    return retried + failed
+
+
+class JobOwnershipLost(RuntimeError):
+    """Raised when a running job was requeued (and possibly claimed again) behind its worker's back"""
+
+
+def _owned(job_id: int, attempts: int):
+    """Criteria matching the job only while the claim made at ``attempts`` still holds"""
+    return (IngestionJob.id == job_id) & (IngestionJob.status == "running") & (IngestionJob.attempts == attempts)
+
+
+def _lock_owned_job(db: Session, job_id: int, attempts: int, read: bool = False) -> Optional[IngestionJob]:
+    """Lock the job row if the claim made at ``attempts`` still holds, else return None"""
+    return db.execute(
+        sa.select(IngestionJob).where(_owned(job_id, attempts)).with_for_update(read=read)
+    ).scalar_one_or_none()
+
+
+def _record_progress(job_id: int, attempts: int, **values) -> bool:
+    """Publish a running job's heartbeat (and ``values``) outside the worker's transaction.
+
+    Returns False if the job is no longer owned by this claim.
+    """
+    with engine.begin() as connection:
+        return connection.execute(
+            sa.update(IngestionJob)
+            .where(_owned(job_id, attempts))
+            .values(heartbeat_at=sa.func.now(), **values)
+        ).rowcount > 0
+
+
+async def _keep_alive(job_id: int, attempts: int):
+    """Heartbeat a running job until cancelled, even while nothing reports progress (long parses, provider backoff)"""
+    while True:
+        await asyncio.sleep(INGESTION_HEARTBEAT_INTERVAL)
+        if not _record_progress(job_id, attempts):
+            logger.warning("Ingestion job %s was requeued while attempt %s was still running", job_id, attempts)
+            return
+
+
+async def run_job(job_id: int):
+    """Chunk and embed the document of a claimed job and record the outcome.
+
+    A failed attempt removes the chunks it already inserted and puts the job
+    back in the queue until it has been tried ``INGESTION_MAX_ATTEMPTS`` times.
+
+    Every write is fenced on the claim (``status = 'running'`` and the
+    ``attempts`` count it set): if ``requeue_stale_jobs`` gave the job to
+    another worker, this attempt's chunk commits fail and it records no
+    outcome, leaving the document to the new claimant.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(IngestionJob, job_id)
+        if job is None:  # The document was deleted since the job was claimed
+            return
+        document_id = job.document_id
+        conversation_id = job.document.conversation_id
+        attempts = job.attempts
+
+        def check_ownership(session: Session):
+            # Share-lock the job row for the rest of the transaction, so it
+            # cannot be requeued between this check and the commit
+            if _lock_owned_job(session, job_id, attempts, read=True) is None:
+                raise JobOwnershipLost(f"Ingestion job {job_id} is no longer owned by attempt {attempts}")
+
+        try:
+            heartbeat = asyncio.create_task(_keep_alive(job_id, attempts))
+            sa.event.listen(db, "before_commit", check_ownership)
+            try:
+                # Chunks left by an earlier attempt that lost its claim
+                db.query(Chunk).filter(Chunk.document_id == document_id).delete(synchronize_session=False)
+                db.commit()
+                chunk_count = await process_document(
+                    document_id, db,
+                    progress=lambda embedded, total: _record_progress(
+                        job_id, attempts, chunks_embedded=embedded, chunks_total=total
+                    )
+                )
+                # Give the conversation its partial vector index once it is large
+                # enough, before the new chunk count is committed below; the
+                # concurrent build needs this session's transaction closed
+                db.commit()
+                await asyncio.to_thread(ensure_conversation_index, engine, conversation_id)
+            finally:
+                sa.event.remove(db, "before_commit", check_ownership)
+                heartbeat.cancel()
+
+            job = _lock_owned_job(db, job_id, attempts)
+            if job is None:
+                raise JobOwnershipLost(f"Ingestion job {job_id} is no longer owned by attempt {attempts}")
+            # A streamed upload keeps its source file (removed with the document),
+            # so the document can be ingested again
+            bump_corpus_version(conversation_id, db)
+            job.status = "succeeded"
+            job.chunks_embedded = job.chunks_total = chunk_count
+            job.error = None
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            invalidate_conversation(conversation_id)
+            logger.info("Ingestion job %s embedded %s chunks of document %s", job_id, chunk_count, document_id)
+        except JobOwnershipLost as e:
+            db.rollback()
+            logger.warning("Abandoning ingestion job %s for document %s: %s", job_id, document_id, e)
+        except Exception as e:  # noqa: BLE001
+            db.rollback()
+            logger.exception("Ingestion job %s failed for document %s: %s", job_id, document_id, e)
+
+            job = _lock_owned_job(db, job_id, attempts)
+            if job is None:  # Deleted with its document, or requeued and claimed again
+                db.rollback()
+                return
+            # Drop partially inserted chunks so a retry starts from a clean document
+            db.query(Chunk).filter(Chunk.document_id == document_id).delete(synchronize_session=False)
+            job.error = str(e) or e.__class__.__name__
+            if job.attempts < INGESTION_MAX_ATTEMPTS:
+                job.status = "queued"
+            else:
+                job.status = "failed"
+                job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+    finally:
+        db.close()
+
+
+class IngestionWorkerPool:
+    """Bounded pool of asyncio tasks draining the ingestion queue.
+
+    Each worker claims one job at a time, so at most ``workers`` documents are
+    ingested concurrently per process. Idle workers poll every
+    ``poll_interval`` seconds, and are woken immediately by ``notify`` when a
+    job is queued in the same process.
+    """
+
+    def __init__(self, workers: int = INGESTION_WORKERS, poll_interval: float = INGESTION_POLL_INTERVAL):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_recovery = 0.0
+
+    def start(self):
+        """Start the worker tasks on the running event loop"""
+        if self.tasks or self.workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self.tasks = [asyncio.create_task(self._work(n)) for n in range(self.workers)]
+        logger.info("Started %s ingestion workers", self.workers)
+
+    async def stop(self):
+        """Cancel the worker tasks; interrupted jobs are recovered once stale"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def run_forever(self):
+        """Run the workers until cancelled (for a dedicated worker process)"""
+        self.start()
+        await asyncio.gather(*self.tasks)
+
+    def notify(self):
+        """Wake idle workers after a job was queued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _claim(self) -> Optional[int]:
+        db = SessionLocal()
+        try:
+            job_id = claim_next_job(db)
+            if job_id is None and time.monotonic() - self._last_recovery > INGESTION_JOB_TIMEOUT / 2:
+                self._last_recovery = time.monotonic()
+                requeue_stale_jobs(db)
+            return job_id
+        finally:
+            db.close()
+
+    async def _work(self, worker: int):
+        while True:
+            try:
+                self._wakeup.clear()
+                job_id = self._claim()
+                if job_id is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                logger.info("Ingestion worker %s running job %s", worker, job_id)
+                await run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # noqa: BLE001
+                logger.exception("Ingestion worker %s error: %s", worker, e)
+                await asyncio.sleep(self.poll_interval)
+
+
+# Global worker pool
+ingestion_workers = IngestionWorkerPool()
@@ -0,0 +1,202 @@
+import glob
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.models import Chunk
+from app.services.embedding_backends import EMBEDDING_DIMENSION
+
+logger = logging.getLogger(__name__)
+
+# In-process index configuration
+MEMORY_INDEX_ENABLED = os.getenv("MEMORY_INDEX_ENABLED", "false").lower() == "true"
+MEMORY_INDEX_MAX_CHUNKS = int(os.getenv("MEMORY_INDEX_MAX_CHUNKS", "20000"))  # Larger conversations use pgvector
+MEMORY_INDEX_MAX_CONVERSATIONS = int(os.getenv("MEMORY_INDEX_MAX_CONVERSATIONS", "64"))  # In-process LRU size
+MEMORY_INDEX_SNAPSHOT_DIR = os.getenv("MEMORY_INDEX_SNAPSHOT_DIR")  # Unset disables .npy snapshots
+
+
+class ConversationVectorIndex:
+    """Brute-force cosine index over one conversation's chunk embeddings.
+
+    Embeddings are held as a contiguous, L2-normalized float32 matrix (possibly
+    memory-mapped from a snapshot) next to the matching chunk ids, so a search
+    is a single matrix product followed by an ``argpartition`` top-k.
+    ``signature`` identifies the state of the conversation's chunks the index
+    was built from (see ``_signature``).
+    """
+
+    def __init__(self, chunk_ids: np.ndarray, matrix: np.ndarray, signature: Tuple[int, int]):
+        self.chunk_ids = chunk_ids
+        self.matrix = matrix
+        self.signature = signature
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    def search(self, query_embeddings: Sequence[Sequence[float]], limit: int) -> List[List[Tuple[int, float]]]:
+        """Return ``[(chunk_id, cosine distance), ...]`` per query, nearest first"""
+        if not len(self) or limit <= 0:
+            return [[] for _ in query_embeddings]
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        np.divide(queries, norms, out=queries, where=norms > 0)
+
+        distances = 1.0 - queries @ self.matrix.T
+        k = min(limit, len(self))
+
+        rankings = []
+        for row in distances:
+            top = np.argpartition(row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+            top = top[np.argsort(row[top], kind="stable")]
+            rankings.append([(int(self.chunk_ids[i]), float(row[i])) for i in top])
+        return rankings
+
+
+def _signature(conversation_id: int, db: Session) -> Tuple[int, int]:
+    """Cheap fingerprint of a conversation's embedded chunks: (count, max id).
+
+    Chunk ids only grow, so any upload raises the max id and any deletion
+    lowers the count. Comparing it lets every worker notice changes made by
+    other workers without a shared invalidation channel.
+    """
+    count, max_id = db.query(sa.func.count(Chunk.id), sa.func.max(Chunk.id)).filter(
+        Chunk.conversation_id == conversation_id,
+        Chunk.embedding.is_not(None)
+    ).one()
+    return count, max_id or 0
+
+
+class MemoryVectorIndex:
+    """Per-conversation ``ConversationVectorIndex`` registry.
+
+    Postgres stays the source of truth: an index is (re)built from the chunks
+    table whenever its signature no longer matches, and conversations with more
+    than ``max_chunks`` embedded chunks are not indexed at all so their searches
+    fall back to pgvector. When ``snapshot_dir`` is set, built matrices are also
+    saved as ``.npy`` files that other workers memory-map instead of reloading
+    embeddings from the database.
+    """
+
+    def __init__(self, max_chunks: int = MEMORY_INDEX_MAX_CHUNKS,
+                 max_conversations: int = MEMORY_INDEX_MAX_CONVERSATIONS,
+                 snapshot_dir: Optional[str] = MEMORY_INDEX_SNAPSHOT_DIR):
+        self.max_chunks = max_chunks
+        self.max_conversations = max_conversations
+        self.snapshot_dir = snapshot_dir
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+
+        self._indexes: "OrderedDict[int, ConversationVectorIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: int, db: Session) -> Optional[ConversationVectorIndex]:
+        """Return an up-to-date index for the conversation, or None to use pgvector"""
+        signature = _signature(conversation_id, db)
+        if signature[0] > self.max_chunks:
+            return None
+
+        with self._lock:
+            index = self._indexes.get(conversation_id)
+            if index is not None and index.signature == signature:
+                self._indexes.move_to_end(conversation_id)
+                return index
+
+        index = self._load_snapshot(conversation_id, signature) or self._build(conversation_id, signature, db)
+
+        with self._lock:
+            self._indexes[conversation_id] = index
+            self._indexes.move_to_end(conversation_id)
+            while len(self._indexes) > self.max_conversations:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, conversation_id: int):
+        """Forget the conversation's index and remove its snapshots"""
+        with self._lock:
+            self._indexes.pop(conversation_id, None)
+        for path in self._snapshot_paths(conversation_id):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _build(self, conversation_id: int, signature: Tuple[int, int], db: Session) -> ConversationVectorIndex:
+        rows = db.query(Chunk.id, Chunk.embedding).filter(
+            Chunk.conversation_id == conversation_id,
+            Chunk.embedding.is_not(None)
+        ).order_by(Chunk.id).all()
+
+        chunk_ids = np.fromiter((chunk_id for chunk_id, _ in rows), dtype=np.int64, count=len(rows))
+        matrix = np.empty((len(rows), EMBEDDING_DIMENSION), dtype=np.float32)
+        for i, (_, embedding) in enumerate(rows):
+            matrix[i] = embedding
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+        index = ConversationVectorIndex(chunk_ids, matrix, signature)
+        self._save_snapshot(conversation_id, index)
+        return index
+
+    def _snapshot_prefix(self, conversation_id: int) -> str:
+        return os.path.join(self.snapshot_dir, f"conversation_{conversation_id}_")
+
+    def _snapshot_paths(self, conversation_id: int) -> List[str]:
+        if not self.snapshot_dir:
+            return []
+        return glob.glob(f"{self._snapshot_prefix(conversation_id)}*.npy")
+
+    def _snapshot_path(self, conversation_id: int, signature: Tuple[int, int], kind: str) -> str:
+        return f"{self._snapshot_prefix(conversation_id)}{signature[0]}_{signature[1]}_{kind}.npy"
+
+    def _load_snapshot(self, conversation_id: int,
+                       signature: Tuple[int, int]) -> Optional[ConversationVectorIndex]:
+        if not self.snapshot_dir:
+            return None
+        try:
+            chunk_ids = np.load(self._snapshot_path(conversation_id, signature, "ids"))
+            matrix = np.load(self._snapshot_path(conversation_id, signature, "matrix"), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if len(chunk_ids) != len(matrix):
+            return None
+        return ConversationVectorIndex(chunk_ids, matrix, signature)
+
+    def _save_snapshot(self, conversation_id: int, index: ConversationVectorIndex):
+        if not self.snapshot_dir:
+            return
+
+        # Older snapshots of this conversation are stale by construction
+        for path in self._snapshot_paths(conversation_id):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        try:
+            # Write to temporary files and rename, so readers never map a partial file.
+            # The matrix goes last since loading starts from it being present.
+            for kind, array in (("ids", index.chunk_ids), ("matrix", index.matrix)):
+                fd, temporary_path = tempfile.mkstemp(dir=self.snapshot_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, array)
+                os.replace(temporary_path, self._snapshot_path(conversation_id, index.signature, kind))
+        except OSError as e:
+            logger.warning("Failed to write vector index snapshot for conversation %s: %s", conversation_id, e)
+
+
+# Process-wide index used by vector_search
+memory_index: Optional[MemoryVectorIndex] = MemoryVectorIndex() if MEMORY_INDEX_ENABLED else None
+
+
+def invalidate_conversation(conversation_id: int):
+    """Drop the in-process index of a conversation after its documents change"""
+    if memory_index is not None:
+        memory_index.invalidate(conversation_id)
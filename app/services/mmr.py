@@ -0,0 +1,90 @@
+import os
+from typing import List, Sequence
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.models import Chunk
+
+# Maximal marginal relevance configuration
+MMR_ENABLED = os.getenv("MMR_ENABLED", "true").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1.0 ranks by relevance only, 0.0 by novelty only
+MMR_OVERSAMPLE = int(os.getenv("MMR_OVERSAMPLE", "3"))  # Candidates fetched per final chunk
+# Candidates at least this similar to an already selected chunk are dropped as duplicates
+MMR_DUPLICATE_THRESHOLD = float(os.getenv("MMR_DUPLICATE_THRESHOLD", "0.95"))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def mmr_select(query_embedding: Sequence[float], candidate_embeddings: np.ndarray, k: int,
+               lambda_: float = MMR_LAMBDA, duplicate_threshold: float = MMR_DUPLICATE_THRESHOLD) -> List[int]:
+    """Pick up to ``k`` candidates by maximal marginal relevance.
+
+    Each step selects the candidate maximizing
+    ``lambda_ * sim(query, c) - (1 - lambda_) * max(sim(c, selected))``. The
+    candidate similarity matrix is computed once, and the running maximum
+    similarity to the selection is updated with one row per step. Candidates
+    whose similarity to the selection reaches ``duplicate_threshold`` are never
+    selected, so fewer than ``k`` indices may be returned.
+
+    Returns candidate indices in selection order.
+    """
+    candidates = _normalize(np.asarray(candidate_embeddings, dtype=np.float32))
+    if k <= 0 or not len(candidates):
+        return []
+
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    max_similarity = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    selected: List[int] = []
+
+    while len(selected) < k and available.any():
+        # No redundancy penalty until something has been selected
+        redundancy = np.maximum(max_similarity, 0) if selected else 0
+        scores = np.where(available, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+        available &= max_similarity < duplicate_threshold
+
+    return selected
+
+
+def mmr_rerank(query_embedding: Sequence[float], chunks: List[Chunk], db: Session, limit: int) -> List[Chunk]:
+    """Diversify ``chunks`` down to at most ``limit`` by maximal marginal relevance.
+
+    Embeddings already loaded with the chunks (search hits carry theirs, and
+    context expansion loads them when asked to) are used as is; any others are
+    loaded with a single query. Chunks without an embedding are skipped.
+    Returns the selected chunks in selection order.
+    """
+    if not chunks:
+        return []
+
+    embeddings = {}
+    unloaded = []
+    for chunk in chunks:
+        if "embedding" in sa.inspect(chunk).unloaded:
+            unloaded.append(chunk.id)
+        elif chunk.embedding is not None:
+            embeddings[chunk.id] = chunk.embedding
+    if unloaded:
+        embeddings.update(db.query(Chunk.id, Chunk.embedding).filter(
+            Chunk.id.in_(unloaded),
+            Chunk.embedding.is_not(None)
+        ).all())
+    candidates = [chunk for chunk in chunks if chunk.id in embeddings]
+    if not candidates:
+        return chunks[:limit]
+
+    matrix = np.asarray([embeddings[chunk.id] for chunk in candidates], dtype=np.float32)
+    return [candidates[i] for i in mmr_select(query_embedding, matrix, limit)]
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.models import Chunk, Conversation
+
+# Cache configuration
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2048"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def query_hash(query: str) -> str:
+    """Hash of ``query`` with leading, trailing and repeated whitespace normalized"""
+    return hashlib.sha256(_WHITESPACE.sub(" ", query).strip().encode("utf-8")).hexdigest()
+
+
+def get_corpus_version(conversation_id: int, db: Session) -> Optional[int]:
+    """Current corpus version of the conversation, or None if it does not exist"""
+    return db.query(Conversation.corpus_version).filter(Conversation.id == conversation_id).scalar()
+
+
+def bump_corpus_version(conversation_id: int, db: Session):
+    """Invalidate every cached retrieval of the conversation.
+
+    The increment is done in SQL so concurrent bumps never collapse into one,
+    and ``Conversation.chunk_count`` is recounted in the same statement. The
+    caller commits.
+    """
+    embedded_chunks = sa.select(sa.func.count(Chunk.id)).where(
+        Chunk.conversation_id == conversation_id, Chunk.embedding.is_not(None)
+    ).scalar_subquery()
+    db.query(Conversation).filter(Conversation.id == conversation_id).update(
+        {Conversation.corpus_version: Conversation.corpus_version + 1, Conversation.chunk_count: embedded_chunks},
+        synchronize_session=False
+    )
+
+
+class RetrievalCache:
+    """In-process LRU of retrieval results, stored as ordered chunk id lists.
+
+    Keys include the conversation's ``corpus_version``, which is bumped
+    whenever its documents change, so an entry can never be served for a
+    different set of chunks; superseded entries simply age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(kind: str, conversation_id: int, corpus_version: int, query: str, limit: int,
+            *options) -> Tuple:
+        """Cache key of one retrieval; ``options`` holds any other argument affecting the result"""
+        return (kind, conversation_id, corpus_version, query_hash(query), limit) + options
+
+    def get(self, key: Tuple, db: Session) -> Optional[List[Chunk]]:
+        """Return the cached chunks for ``key`` in their cached order, or None on a miss"""
+        with self._lock:
+            chunk_ids = self._entries.get(key)
+            if chunk_ids is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+
+        if not chunk_ids:
+            return []
+        chunks = {chunk.id: chunk for chunk in db.query(Chunk).filter(Chunk.id.in_(chunk_ids))}
+        return [chunks[chunk_id] for chunk_id in chunk_ids if chunk_id in chunks]
+
+    def put(self, key: Tuple, chunks: List[Chunk]):
+        with self._lock:
+            self._entries[key] = [chunk.id for chunk in chunks]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache used by agent_service
+retrieval_cache: Optional[RetrievalCache] = RetrievalCache() if RETRIEVAL_CACHE_ENABLED else None
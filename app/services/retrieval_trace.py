@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class RetrievalTrace:
+    """Per-request record of where retrieval time goes.
+
+    ``stage(name)`` times a block and counts the SQL statements it sends over
+    the request session's connection (statements on other connections, such
+    as the embedding cache's, are not counted). ``note_chunk`` records the
+    score and source stage of each chunk considered.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.stages: List[Dict] = []
+        self.chunks: Dict[int, Dict] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        connection = self.db.connection()
+        statements = 0
+
+        def count(conn, *args, **kwargs):
+            nonlocal statements
+            if conn is connection:
+                statements += 1
+
+        engine = self.db.get_bind()
+        event.listen(engine, "before_cursor_execute", count)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            event.remove(engine, "before_cursor_execute", count)
+            self.stages.append({"stage": name, "ms": round(elapsed * 1000, 3), "queries": statements})
+
+    def note_chunk(self, chunk_id: int, source: str, score: Optional[float] = None, **details):
+        """Record how a chunk was found; the first source recorded for a chunk wins"""
+        entry = self.chunks.setdefault(chunk_id, {"source": source, "score": score})
+        entry.update({key: value for key, value in details.items() if value is not None})
+
+    def summary(self) -> Dict:
+        return {
+            "stages": self.stages,
+            "total_ms": round(sum(stage["ms"] for stage in self.stages), 3),
+            "total_queries": sum(stage["queries"] for stage in self.stages),
+        }
+
+
+def trace_stage(trace: Optional[RetrievalTrace], name: str):
+    """``trace.stage(name)``, or a no-op when not tracing"""
+    return trace.stage(name) if trace is not None else nullcontext()
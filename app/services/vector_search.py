@@ -0,0 +1,191 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.models import Chunk, Conversation
+from app.services.ann_index import apply_search_settings, use_exact_search
+from app.services.embedding_backends import EMBEDDING_DIMENSION
+from app.services.memory_index import memory_index
+
+# Reciprocal rank fusion constant; larger values flatten the contribution of top ranks
+RRF_K = 60
+
+# Full-text search configuration (must match the Chunk.search_vector expression)
+TEXT_SEARCH_CONFIG = "english"
+MAX_LEXICAL_TERMS = 64  # Distinct query terms kept for the full-text query
+
+_TERM_PATTERN = re.compile(r"\w+")
+
+
+def _search_statement(query_embeddings: Sequence[Sequence[float]], conversation_id: int, limit: int,
+                      exact: bool = False) -> sa.Select:
+    """The multi-query ``VALUES`` + ``LATERAL`` nearest-neighbour statement of ``search_chunks``.
+
+    With ``exact``, the neighbours are ordered by ``distance + 0``: a vector
+    index only serves an ``ORDER BY embedding <=> query``, so this keeps the
+    planner off every vector index for this ordering alone, while the
+    ``conversation_id`` filter and the primary-key join still use their
+    btree indexes.
+    """
+    queries = sa.values(
+        sa.column("query_index", sa.Integer),
+        sa.column("embedding", Vector(EMBEDDING_DIMENSION)),
+        name="queries",
+    ).data([(i, list(embedding)) for i, embedding in enumerate(query_embeddings)])
+
+    distance = Chunk.embedding.cosine_distance(sa.cast(queries.c.embedding, Vector(EMBEDDING_DIMENSION)))
+    hits = sa.select(
+        Chunk.id.label("chunk_id"),
+        distance.label("distance"),
+    ).where(
+        Chunk.conversation_id == conversation_id,
+        Chunk.embedding.is_not(None)  # Ensure embedding exists
+    ).correlate(queries).order_by(distance + 0 if exact else distance).limit(limit).lateral("hits")
+
+    return sa.select(Chunk, queries.c.query_index, hits.c.distance).select_from(
+        queries
+    ).join(
+        hits, sa.true()
+    ).join(
+        Chunk, Chunk.id == hits.c.chunk_id
+    ).order_by(
+        queries.c.query_index, hits.c.distance
+    )
+
+
+class _ExplainAnalyze(Executable, ClauseElement):
+    """``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` of a statement"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_ExplainAnalyze, "postgresql")
+def _compile_explain_analyze(element, compiler, **kw):
+    return f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+def explain_search(query_embeddings: Sequence[Sequence[float]], conversation_id: int, db: Session,
+                   limit: int, ef_search: Optional[int] = None, probes: Optional[int] = None):
+    """Run the pgvector search of ``search_chunks`` under ``EXPLAIN ANALYZE`` and return the JSON plan.
+
+    The statement really executes, with the same recall settings, so the plan
+    shows actual timings and whether the vector index was used.
+    """
+    apply_search_settings(db, ef_search=ef_search, probes=probes)
+    exact = use_exact_search(_chunk_count(conversation_id, db))
+    return db.execute(_ExplainAnalyze(_search_statement(query_embeddings, conversation_id, limit, exact))).scalar()
+
+
+def _chunk_count(conversation_id: int, db: Session) -> int:
+    """Embedded chunks of the conversation; free when the conversation is already loaded in the session"""
+    conversation = db.get(Conversation, conversation_id)
+    return conversation.chunk_count if conversation is not None else 0
+
+
+def search_chunks(query_embeddings: Sequence[Sequence[float]], conversation_id: int, db: Session,
+                  limit: int, ef_search: Optional[int] = None,
+                  probes: Optional[int] = None) -> List[List[Tuple[Chunk, float]]]:
+    """Run a nearest-neighbour search for several query embeddings in one statement.
+
+    The query embeddings are passed as a ``VALUES`` list and each one drives a
+    ``LATERAL`` ``ORDER BY embedding <=> query LIMIT limit`` subquery, so every
+    query can still use the vector index while the whole batch costs a single
+    round-trip. The search is scoped to the conversation through the
+    denormalized ``Chunk.conversation_id``: conversations large enough to
+    have their own partial index (built at ingest, see
+    ``ann_index.ensure_conversation_index``) use it, and smaller ones, going
+    by ``Conversation.chunk_count``, are always scanned exactly (see
+    ``ann_index.use_exact_search``) rather than filtering the neighbours found
+    in the global index.
+
+    ``ef_search`` / ``probes`` set the index recall knobs for this search (see
+    ``ann_index.apply_search_settings``).
+
+    When the in-process index is enabled (``MEMORY_INDEX_ENABLED``) and the
+    conversation is small enough, the search is answered exactly from memory
+    instead (see ``memory_index.MemoryVectorIndex``) and only the hits are
+    loaded from Postgres.
+
+    Returns one ``[(chunk, cosine distance), ...]`` ranking per query embedding,
+    nearest first.
+    """
+    rankings: List[List[Tuple[Chunk, float]]] = [[] for _ in query_embeddings]
+    if not query_embeddings or limit <= 0:
+        return rankings
+
+    index = memory_index.get(conversation_id, db) if memory_index is not None else None
+    if index is not None:
+        return _hydrate(index.search(query_embeddings, limit), db)
+
+    apply_search_settings(db, ef_search=ef_search, probes=probes)
+    exact = use_exact_search(_chunk_count(conversation_id, db))
+    rows = db.execute(_search_statement(query_embeddings, conversation_id, limit, exact)).all()
+
+    for chunk, query_index, chunk_distance in rows:
+        rankings[query_index].append((chunk, chunk_distance))
+
+    return rankings
+
+
+def lexical_search(query: str, conversation_id: int, db: Session, limit: int) -> List[Tuple[Chunk, float]]:
+    """Rank the conversation's chunks against ``query`` with Postgres full-text search.
+
+    The query's distinct terms are OR-ed together (turn responses are long, so
+    requiring every term would match nothing) and matches are ranked with
+    ``ts_rank_cd`` normalized by document length, which like BM25 rewards
+    repeated and co-occurring terms without favouring long chunks. Matching uses
+    the GIN index on ``Chunk.search_vector``; stop words are dropped by Postgres.
+
+    Returns ``[(chunk, rank), ...]``, best match first.
+    """
+    terms = list(dict.fromkeys(term.lower() for term in _TERM_PATTERN.findall(query)))[:MAX_LEXICAL_TERMS]
+    if not terms or limit <= 0:
+        return []
+
+    tsquery = sa.func.to_tsquery(TEXT_SEARCH_CONFIG, " | ".join(f"'{term}'" for term in terms))
+    rank = sa.func.ts_rank_cd(Chunk.search_vector, tsquery, 1)
+
+    rows = db.query(Chunk, rank).filter(
+        Chunk.conversation_id == conversation_id,
+        Chunk.search_vector.op("@@")(tsquery)
+    ).order_by(rank.desc(), Chunk.id).limit(limit).all()
+
+    return [(chunk, chunk_rank) for chunk, chunk_rank in rows]
+
+
+def _hydrate(hits: List[List[Tuple[int, float]]], db: Session) -> List[List[Tuple[Chunk, float]]]:
+    """Replace the chunk ids of in-memory search hits by their Chunk rows"""
+    chunk_ids = {chunk_id for ranking in hits for chunk_id, _ in ranking}
+    chunks = {chunk.id: chunk for chunk in db.query(Chunk).filter(Chunk.id.in_(chunk_ids))} if chunk_ids else {}
+    # A chunk deleted since the index was checked is simply dropped
+    return [
+        [(chunks[chunk_id], distance) for chunk_id, distance in ranking if chunk_id in chunks]
+        for ranking in hits
+    ]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Chunk]], k: int = RRF_K) -> List[Tuple[Chunk, float]]:
+    """Fuse several rankings into one using reciprocal rank fusion.
+
+    Each chunk scores ``sum(1 / (k + rank))`` over the rankings it appears in
+    (ranks start at 1). Ties keep the order in which chunks were first seen.
+    """
+    scores: Dict[int, float] = defaultdict(float)
+    chunks: Dict[int, Chunk] = {}
+
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk.id] += 1.0 / (k + rank)
+            chunks.setdefault(chunk.id, chunk)
+
+    fused = sorted(chunks, key=lambda chunk_id: scores[chunk_id], reverse=True)
+    return [(chunks[chunk_id], scores[chunk_id]) for chunk_id in fused]
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+"""
+Retrieval benchmark for Roundtable.
+This script generates synthetic conversations, ingests them through
+process_document with an offline embedding backend, runs query workloads
+against the retrieval functions and reports latency percentiles, SQL
+round-trips and vector search recall@k (against exact brute force) as JSON.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+# Embed offline and measure uncached retrieval unless configured otherwise;
+# these must be set before the app modules read them
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+os.environ.setdefault("RETRIEVAL_CACHE_ENABLED", "false")
+
+# Add the parent directory to the path so we can import the app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import event
+
+from app.db import SessionLocal, engine
+from app.models import Conversation, Document, Chunk
+from app.services.agent_service import multi_query_retrieval, RETRIEVAL_MODES
+from app.services.ann_index import VECTOR_INDEX_TYPE, ensure_conversation_index
+from app.services.document_processor import process_document
+from app.services.embedding_backends import EMBEDDING_BACKEND
+from app.services.embedding_service import generate_embeddings
+from app.services.memory_index import MEMORY_INDEX_ENABLED
+from app.services.retrieval_cache import bump_corpus_version
+from app.services.vector_search import search_chunks
+
+TOPICS = [
+    "Solar Energy", "Urban Planning", "Monetary Policy", "Coral Reefs", "Machine Translation",
+    "Public Health", "Supply Chains", "Quantum Computing", "Labor Markets", "Climate Adaptation",
+]
+ENTITIES = ["Acme Corporation", "Geneva", "Maria Lopez", "the World Bank", "Nairobi", "Project Atlas", "Tokyo"]
+VERBS = ["affects", "reduces", "increases", "depends on", "challenges", "supports", "reshapes"]
+OBJECTS = [
+    "long-term investment", "household income", "regional stability", "research funding",
+    "energy prices", "data quality", "public trust", "infrastructure costs", "water supply",
+]
+
+
+class QueryCounter:
+    """Counts SQL statements sent to the database while active"""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def synthetic_document(rng: random.Random, sections: int, paragraphs: int, sentences: int) -> str:
+    """Generate a document with numbered sections, paragraphs and named entities"""
+    parts = []
+    for section in range(1, sections + 1):
+        topic = rng.choice(TOPICS)
+        parts.append(f"{section}. {topic}")
+        for _ in range(paragraphs):
+            paragraph = []
+            for _ in range(sentences):
+                paragraph.append(
+                    f"{rng.choice(ENTITIES)} argues that {topic.lower()} {rng.choice(VERBS)} "
+                    f"{rng.choice(OBJECTS)} in {rng.choice(['the short term', 'most regions', 'practice', 'theory'])}."
+                )
+            parts.append(" ".join(paragraph))
+    return "\n\n".join(parts)
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3), "mean": round(float(np.mean(values)), 3)}
+
+
+async def ingest(db, rng: random.Random, args) -> list:
+    """Create the synthetic conversations and ingest their documents"""
+    conversation_ids = []
+    for c in range(args.conversations):
+        conversation = Conversation(name=f"Benchmark {int(time.time())}-{c}")
+        db.add(conversation)
+        db.commit()
+        conversation_ids.append(conversation.id)
+
+        for d in range(args.documents):
+            document = Document(
+                conversation_id=conversation.id,
+                filename=f"synthetic-{c}-{d}.txt",
+                content=synthetic_document(rng, args.sections, args.paragraphs, args.sentences)
+            )
+            db.add(document)
+            db.commit()
+            await process_document(document.id, db)
+
+        # As an ingestion job does: partial index for a large conversation, then its chunk count
+        db.commit()
+        ensure_conversation_index(engine, conversation.id)
+        bump_corpus_version(conversation.id, db)
+        db.commit()
+    return conversation_ids
+
+
+def exact_top_k(query_embedding, chunk_ids: np.ndarray, matrix: np.ndarray, k: int) -> set:
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    scores = matrix @ query
+    return set(chunk_ids[np.argsort(-scores, kind="stable")[:k]].tolist())
+
+
+async def run_workload(db, conversation_id: int, queries: list, counter: QueryCounter, args) -> dict:
+    """Time each retrieval function and measure search recall for one conversation"""
+    rows = db.query(Chunk.id, Chunk.embedding).filter(
+        Chunk.conversation_id == conversation_id, Chunk.embedding.is_not(None)
+    ).all()
+    chunk_ids = np.asarray([chunk_id for chunk_id, _ in rows])
+    matrix = np.asarray([embedding for _, embedding in rows], dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    query_embeddings = await generate_embeddings(queries)
+
+    results = {}
+
+    # Vector search stage alone, compared with exact brute force
+    latencies, round_trips, recalls = [], [], []
+    for embedding in query_embeddings:
+        counter.count = 0
+        started = time.perf_counter()
+        ranking = search_chunks([embedding], conversation_id, db, limit=args.k,
+                                ef_search=args.ef_search, probes=args.probes)[0]
+        latencies.append((time.perf_counter() - started) * 1000)
+        round_trips.append(counter.count)
+        db.rollback()  # End the transaction so SET LOCAL settings do not leak
+
+        expected = exact_top_k(embedding, chunk_ids, matrix, args.k)
+        found = {chunk.id for chunk, _ in ranking}
+        recalls.append(len(found & expected) / max(len(expected), 1))
+    results["search_chunks"] = {
+        "latency_ms": percentiles(latencies),
+        "sql_round_trips": percentiles(round_trips),
+        f"recall@{args.k}": round(float(np.mean(recalls)), 4) if recalls else None,
+    }
+
+    # End-to-end retrieval in each mode
+    for mode in args.modes:
+        latencies, round_trips = [], []
+        for query in queries:
+            counter.count = 0
+            started = time.perf_counter()
+            await multi_query_retrieval(query, conversation_id, db, ef_search=args.ef_search,
+                                        probes=args.probes, mode=mode)
+            latencies.append((time.perf_counter() - started) * 1000)
+            round_trips.append(counter.count)
+            db.rollback()
+        results[f"multi_query_retrieval[{mode}]"] = {
+            "latency_ms": percentiles(latencies), "sql_round_trips": percentiles(round_trips)
+        }
+
+    results["chunks"] = len(rows)
+    return results
+
+
+async def benchmark(args) -> dict:
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    counter = QueryCounter()
+    conversation_ids = []
+    try:
+        started = time.perf_counter()
+        conversation_ids = await ingest(db, rng, args)
+        ingest_seconds = time.perf_counter() - started
+
+        report = {
+            "config": {
+                "embedding_backend": EMBEDDING_BACKEND,
+                "vector_index_type": VECTOR_INDEX_TYPE,
+                "memory_index": MEMORY_INDEX_ENABLED,
+                "ef_search": args.ef_search,
+                "probes": args.probes,
+                "k": args.k,
+                "conversations": args.conversations,
+                "documents_per_conversation": args.documents,
+                "sections": args.sections,
+                "paragraphs": args.paragraphs,
+                "sentences": args.sentences,
+                "queries": args.queries,
+                "seed": args.seed,
+            },
+            "ingest_seconds": round(ingest_seconds, 3),
+            "conversations": [],
+        }
+
+        for conversation_id in conversation_ids:
+            contents = [content for content, in db.query(Chunk.content).filter(
+                Chunk.conversation_id == conversation_id, Chunk.is_section_header.is_(False)
+            ).all()]
+            # Queries paraphrase existing chunks so every query has true neighbours
+            queries = [
+                " ".join(rng.sample(content.split(), k=min(12, len(content.split()))))
+                for content in rng.sample(contents, k=min(args.queries, len(contents)))
+            ]
+            report["conversations"].append(await run_workload(db, conversation_id, queries, counter, args))
+
+        return report
+    finally:
+        if not args.keep:
+            for conversation_id in conversation_ids:
+                conversation = db.get(Conversation, conversation_id)
+                if conversation is not None:
+                    db.delete(conversation)
+            db.commit()
+        db.close()
+
+
+def main():
+    """Run the retrieval benchmark and print the JSON report"""
+    parser = argparse.ArgumentParser(description="Benchmark retrieval latency and recall on a synthetic corpus")
+    parser.add_argument("--conversations", type=int, default=1, help="Synthetic conversations to create")
+    parser.add_argument("--documents", type=int, default=5, help="Documents per conversation")
+    parser.add_argument("--sections", type=int, default=5, help="Sections per document")
+    parser.add_argument("--paragraphs", type=int, default=4, help="Paragraphs per section")
+    parser.add_argument("--sentences", type=int, default=4, help="Sentences per paragraph")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per conversation")
+    parser.add_argument("--k", type=int, default=5, help="Result count used for recall@k")
+    parser.add_argument("--ef-search", type=int, default=None, help="HNSW ef_search for the searches")
+    parser.add_argument("--probes", type=int, default=None, help="IVFFlat probes for the searches")
+    parser.add_argument("--modes", nargs="+", choices=RETRIEVAL_MODES, default=list(RETRIEVAL_MODES),
+                        help="multi_query_retrieval modes to run")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the corpus and queries")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic conversations afterwards")
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(benchmark(args))
+    except Exception as e:
+        print(f"Error running benchmark: {e}")
+        return False
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Wrote benchmark report to {args.output}")
+    else:
+        print(output)
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Parallel parsing check for Roundtable.
+This script parses and chunks a large synthetic text in the ingestion process
+pool with a growing number of processes, checks that the records match
+in-process chunking and fails unless the parse time falls as
+INGESTION_PROCESSES grows (up to the number of available cores).
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+# Add the parent directory to the path so we can import the app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import document_processor
+from app.services.document_processor import chunk_text, chunk_text_in_pool, get_process_pool, shutdown_process_pool
+
+WORDS = ["energy", "prices", "policy", "water", "supply", "research", "funding", "markets", "trust", "costs"]
+
+# Minimum fraction of the ideal speedup (one per process, up to the core count)
+MIN_EFFICIENCY = 0.5
+
+
+def synthetic_text(chars: int, seed: int = 0) -> str:
+    """Paragraphs of short sentences, about ``chars`` characters in total"""
+    rng = random.Random(seed)
+    paragraphs, size = [], 0
+    while size < chars:
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 15))).capitalize() + "."
+            for _ in range(rng.randint(2, 8))
+        ]
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def best_time(text: str, repeats: int):
+    """Best wall-clock time of ``chunk_text_in_pool`` over ``repeats`` runs, and its records"""
+    pool = get_process_pool()
+    timings = []
+    records = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        records, _ = asyncio.run(chunk_text_in_pool(pool, text))
+        timings.append(time.perf_counter() - started)
+    return min(timings), records
+
+
+def main():
+    """Time pool parsing for each process count and compare with the ideal speedup"""
+    parser = argparse.ArgumentParser(description="Check that parsing scales with INGESTION_PROCESSES")
+    parser.add_argument("--chars", type=int, default=1000000, help="Size of the synthetic text")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4],
+                        help="INGESTION_PROCESSES values to time")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per process count (the best one counts)")
+    args = parser.parse_args()
+
+    text = synthetic_text(args.chars)
+    expected, _ = chunk_text(text)
+    cores = os.cpu_count() or 1
+    ok = True
+
+    timings = {}
+    for processes in args.processes:
+        shutdown_process_pool()
+        document_processor.INGESTION_PROCESSES = processes
+        # Start the workers and load their models before timing
+        asyncio.run(chunk_text_in_pool(get_process_pool(), text))
+        seconds, records = best_time(text, args.repeats)
+        timings[processes] = seconds
+        print(f"INGESTION_PROCESSES={processes}: {seconds * 1000:.0f} ms for {len(text)} characters")
+        if records != expected:
+            print(f"Records differ from in-process chunking with {processes} processes")
+            ok = False
+    shutdown_process_pool()
+
+    baseline = min(args.processes)
+    if cores < 2:
+        print("Only one CPU available: parse times reported, scaling not checked")
+        return ok
+    for processes, seconds in timings.items():
+        ideal = min(processes, cores) / min(baseline, cores)
+        speedup = timings[baseline] / seconds
+        if ideal > 1 and speedup < ideal * MIN_EFFICIENCY:
+            print(f"Not scaling: {processes} processes are {speedup:.2f}x faster than {baseline} "
+                  f"(ideal {ideal:.0f}x on {cores} cores)")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
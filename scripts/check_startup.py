@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Cold-start check for Roundtable.
+This script imports app.main in fresh interpreters, reports the median
+import time and fails when it exceeds the startup budget or when modules that
+are meant to load on first use (spaCy, the OpenAI client, PyPDF2) were
+imported eagerly.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budget for ``import app.main``
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+# Modules that must not be imported just by loading the app
+DEFERRED_MODULES = ["spacy", "openai", "PyPDF2"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED_MODULES,)
+
+
+def measure() -> dict:
+    """Import the app in a fresh interpreter and return its timing"""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Measure the cold-start time of the app and compare it with the budget"""
+    parser = argparse.ArgumentParser(description="Check the cold-start import time of app.main")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="Maximum median import time (defaults to STARTUP_BUDGET_MS)")
+    args = parser.parse_args()
+
+    try:
+        samples = [measure() for _ in range(args.runs)]
+    except subprocess.CalledProcessError as e:
+        print(f"Error importing app.main: {e.stderr}")
+        return False
+
+    median_ms = statistics.median(sample["ms"] for sample in samples)
+    eager = sorted({module for sample in samples for module in sample["loaded"]})
+    print(f"import app.main: median {median_ms:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    ok = True
+    if median_ms > args.budget_ms:
+        print("Startup budget exceeded")
+        ok = False
+    if eager:
+        print(f"Imported at startup but meant to load on first use: {', '.join(eager)}")
+        ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Document structure check for Roundtable.
+This script builds synthetic annotated spaCy Docs (sentences, entities and
+noun chunks, without loading a model), checks that extract_document_structure
+returns exactly what the original per-function extraction returned, and fails
+unless its running time grows roughly linearly with the sentence count.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# Add the parent directory to the path so we can import the app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spacy
+from spacy.tokens import Doc, Span
+
+from app.services.document_processor import SECTION_HEADER_PATTERN, SEMANTIC_ENTITY_LABELS, extract_document_structure
+
+WORDS = ["energy", "prices", "policy", "water", "supply", "research", "funding", "markets", "trust", "costs"]
+VERBS = ["affects", "reduces", "increases", "supports", "challenges"]
+ENTITIES = [("Acme Corporation", "ORG"), ("Geneva", "GPE"), ("Maria Lopez", "PERSON"), ("Project Atlas", "PRODUCT"),
+            ("Nairobi", "GPE"), ("Tuesday", "DATE"), ("the World Bank", "ORG")]
+HEADERS = [["1.", "Introduction"], ["Chapter", "3:", "Results"], ["METHODS"], ["Key", "findings", ":"]]
+
+# Allowed growth of the running time per sentence over a 4x larger document
+LINEAR_TOLERANCE = 2.0
+
+
+def _noun_chunks(doclike):
+    """Noun chunk iterator reading the synthetic chunks stored on the Doc"""
+    doc = doclike.doc
+    start = doclike.start if isinstance(doclike, Span) else 0
+    end = doclike.end if isinstance(doclike, Span) else len(doc)
+    label = doc.vocab.strings.add("NP")
+    for chunk_start, chunk_end in doc.user_data["noun_chunks"]:
+        if chunk_start >= start and chunk_end <= end:
+            yield chunk_start, chunk_end, label
+
+
+def synthetic_doc(vocab, sentences: int, seed: int) -> Doc:
+    """Build a Doc of ``sentences`` sentences with headers, entities and noun chunks"""
+    rng = random.Random(seed)
+    words, spaces, sent_starts, ents, noun_chunks = [], [], [], [], []
+
+    for _ in range(sentences):
+        start = len(words)
+        if rng.random() < 0.05:
+            sentence = list(rng.choice(HEADERS))
+        else:
+            sentence = ["The", rng.choice(WORDS), rng.choice(VERBS)]
+            noun_chunks.append((start, start + 2))
+            if rng.random() < 0.4:
+                entity, label = rng.choice(ENTITIES)
+                ents.append((len(words) + len(sentence), len(words) + len(sentence) + len(entity.split()), label))
+                sentence += entity.split()
+            else:
+                sentence += [rng.choice(WORDS), rng.choice(WORDS)]
+                if rng.random() < 0.5:
+                    noun_chunks.append((start + 3, start + 5))
+            sentence.append(".")
+        words += sentence
+        spaces += [True] * len(sentence)
+        sent_starts += [True] + [False] * (len(sentence) - 1)
+
+    doc = Doc(vocab, words=words, spaces=spaces, sent_starts=sent_starts)
+    doc.ents = [Span(doc, start, end, label=label) for start, end, label in ents]
+    doc.user_data["noun_chunks"] = noun_chunks
+    doc.noun_chunks_iterator = _noun_chunks
+    return doc
+
+
+def reference_structure(doc):
+    """The original extraction: three passes, with quadratic sentence lookups"""
+    sections = []
+    current_section = None
+    current_section_text = []
+    for i, sent in enumerate(doc.sents):
+        sent_text = sent.text.strip()
+        is_header = False
+        header_match = SECTION_HEADER_PATTERN.match(sent_text)
+        if header_match:
+            is_header = True
+            header_text = header_match.group(1)
+        elif len(sent_text) < 100 and sent_text.isupper():
+            is_header = True
+            header_text = sent_text
+        elif sent_text.endswith(':') and len(sent_text) < 100:
+            is_header = True
+            header_text = sent_text.rstrip(':')
+        if is_header:
+            if current_section is not None:
+                sections.append({'title': current_section, 'content': ' '.join(current_section_text),
+                                 'start_idx': i - len(current_section_text), 'end_idx': i - 1})
+            current_section = header_text
+            current_section_text = []
+        else:
+            current_section_text.append(sent_text)
+    if current_section is not None and current_section_text:
+        sections.append({'title': current_section, 'content': ' '.join(current_section_text),
+                         'start_idx': len(list(doc.sents)) - len(current_section_text),
+                         'end_idx': len(list(doc.sents)) - 1})
+    elif current_section_text:
+        sections.append({'title': 'Main Content', 'content': ' '.join(current_section_text),
+                         'start_idx': 0, 'end_idx': len(list(doc.sents)) - 1})
+
+    paragraphs = []
+    current_paragraph = []
+    paragraph_id = 1
+    for i, sent in enumerate(doc.sents):
+        current_paragraph.append(sent.text.strip())
+        next_sent = None
+        if i < len(list(doc.sents)) - 1:
+            for potential_next in doc.sents:
+                if list(doc.sents).index(potential_next) == i + 1:
+                    next_sent = potential_next
+                    break
+        if next_sent is None or sent.end_char + 2 < next_sent.start_char:
+            paragraphs.append({'id': paragraph_id, 'content': ' '.join(current_paragraph),
+                               'start_idx': i - len(current_paragraph) + 1, 'end_idx': i})
+            paragraph_id += 1
+            current_paragraph = []
+    if current_paragraph:
+        paragraphs.append({'id': paragraph_id, 'content': ' '.join(current_paragraph),
+                           'start_idx': len(list(doc.sents)) - len(current_paragraph),
+                           'end_idx': len(list(doc.sents)) - 1})
+
+    semantic_groups = {}
+    main_entities = {}
+    for ent in doc.ents:
+        if ent.label_ in SEMANTIC_ENTITY_LABELS:
+            main_entities.setdefault(ent.text, []).append(ent.start_char)
+    for i, sent in enumerate(doc.sents):
+        assigned_group = None
+        for entity, positions in main_entities.items():
+            if any(sent.start_char <= pos < sent.end_char for pos in positions):
+                assigned_group = f"Topic: {entity}"
+                break
+        if not assigned_group:
+            main_nouns = [chunk.text for chunk in sent.noun_chunks]
+            assigned_group = f"Topic: {main_nouns[0]}" if main_nouns else "General Content"
+        semantic_groups[i] = assigned_group
+
+    return sections, paragraphs, semantic_groups
+
+
+def best_time(doc, repeats: int) -> float:
+    """Best wall-clock time of ``extract_document_structure`` over ``repeats`` runs"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        extract_document_structure(doc)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    """Check equivalence with the original extraction, then linear scaling"""
+    parser = argparse.ArgumentParser(description="Check extract_document_structure against the original extraction")
+    parser.add_argument("--docs", type=int, default=40, help="Synthetic Docs compared with the original extraction")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 80000],
+                        help="Sentence counts timed for the scaling check")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per size (the best one counts)")
+    args = parser.parse_args()
+
+    vocab = spacy.blank("en").vocab
+    ok = True
+
+    mismatches = 0
+    for seed in range(args.docs):
+        doc = synthetic_doc(vocab, sentences=random.Random(seed).randint(1, 150), seed=seed)
+        if extract_document_structure(doc) != reference_structure(doc):
+            mismatches += 1
+            print(f"Mismatch with the original extraction for synthetic Doc {seed}")
+    print(f"Equivalence: {args.docs - mismatches}/{args.docs} synthetic Docs match the original extraction")
+    ok = ok and not mismatches
+
+    timings = []
+    for size in args.sizes:
+        seconds = best_time(synthetic_doc(vocab, sentences=size, seed=size), args.repeats)
+        timings.append(seconds)
+        print(f"{size} sentences: {seconds * 1000:.1f} ms ({seconds / size * 1e6:.2f} us per sentence)")
+
+    for (small, small_time), (large, large_time) in zip(zip(args.sizes, timings), zip(args.sizes[1:], timings[1:])):
+        growth = (large_time / large) / (small_time / small)
+        if growth > LINEAR_TOLERANCE:
+            print(f"Not linear: time per sentence grew {growth:.2f}x from {small} to {large} sentences")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
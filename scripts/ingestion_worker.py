@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Ingestion worker for Roundtable.
+This script drains the document ingestion queue in a dedicated process, for
+deployments that run the API with INGESTION_WORKERS=0 or that need more
+ingestion capacity than the API processes provide. Any number of worker
+processes can run against the same database.
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import argparse
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ingestion_queue import INGESTION_POLL_INTERVAL, IngestionWorkerPool
+
+
+def main():
+    """Run ingestion workers until interrupted"""
+    parser = argparse.ArgumentParser(description="Process queued document ingestion jobs")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("INGESTION_WORKERS", "2")) or 2,
+                        help="Concurrent jobs in this process")
+    parser.add_argument("--poll-interval", type=float, default=INGESTION_POLL_INTERVAL,
+                        help="Seconds between polls of an idle worker")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    pool = IngestionWorkerPool(workers=args.workers, poll_interval=args.poll_interval)
+    try:
+        asyncio.run(pool.run_forever())
+    except KeyboardInterrupt:
+        print("Stopping ingestion workers")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Vector index maintenance script for Roundtable.
+This script rebuilds the chunk embedding index when it is missing, uses a
+different strategy than configured, or (for IVFFlat) was trained on a row
+count that no longer matches the table. It also maintains the partial
+per-conversation indexes of large conversations.
+"""
+
+import os
+import sys
+import argparse
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import engine
+from app.services.ann_index import INDEX_TYPES, VECTOR_INDEX_TYPE, ensure_conversation_indexes, rebuild_index
+
+
+def main():
+    """Check the vector index and rebuild it if needed"""
+    parser = argparse.ArgumentParser(description="Rebuild or retrain the chunk embedding index")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=VECTOR_INDEX_TYPE,
+                        help="Index strategy to use (defaults to VECTOR_INDEX_TYPE)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the index looks current")
+    parser.add_argument("--check", action="store_true", help="Only report whether a rebuild is needed")
+    args = parser.parse_args()
+
+    try:
+        status = rebuild_index(engine, index_type=args.index_type, force=args.force, dry_run=args.check)
+        partial = ensure_conversation_indexes(engine, index_type=args.index_type, dry_run=args.check)
+    except Exception as e:
+        print(f"Error maintaining vector index: {e}")
+        return False
+
+    index = status["index"]
+    print(f"Chunks with embeddings: {status['rows']}")
+    print(f"Current index: {index['definition'] if index else 'none'}")
+    if status["reason"] is None:
+        print("Index is up to date")
+    elif status["rebuilt"]:
+        print(f"Index rebuilt ({status['reason']})")
+    else:
+        print(f"Rebuild needed ({status['reason']})")
+
+    verb = "Would create" if args.check else "Created"
+    for name in partial["created"]:
+        print(f"{verb} partial index {name}")
+    verb = "Would drop" if args.check else "Dropped"
+    for name in partial["dropped"]:
+        print(f"{verb} partial index {name}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -13,7 +13,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.db import SessionLocal
 from app.models import Conversation, Document, Chunk, Turn, ModelConfig
-from app.services.document_processor import generate_embedding
+from app.services.chunk_graph import assign_chunk_ids, link_chunk_neighbors
+from app.services.embedding_service import generate_embeddings
 
 
 # Sample model configurations
@@ -164,17 +165,26 @@ async def seed_database():
             # Simple sentence splitting for demo purposes
             sentences = [s.strip() for s in document.content.split('.') if s.strip()]
             
+            # Generate embeddings for all sentences in one batched call
+            embeddings = await generate_embeddings(sentences)
+            
             # Create chunks
-            for i, sentence in enumerate(sentences):
-                chunk = Chunk(
+            chunks = [
+                Chunk(
                     document_id=document.id,
+                    conversation_id=document.conversation_id,
                     sequence_number=i + 1,
-                    content=sentence
+                    content=sentence,
+                    embedding=embedding
                 )
-                # Generate embedding
-                embedding = await generate_embedding(sentence)
-                chunk.embedding = embedding
-                db.add(chunk)
+                for i, (sentence, embedding) in enumerate(zip(sentences, embeddings))
+            ]
+            
+            # Link adjacent chunks for context expansion
+            if chunks:
+                assign_chunk_ids(chunks, db)
+                link_chunk_neighbors(chunks)
+            db.add_all(chunks)
             
             db.commit()
             print(f"Processed document {document.id} into {len(sentences)} chunks")